@@ -3,15 +3,32 @@ matplotlib.use('Agg')  # Force Matplotlib to use the Agg backend for server-side
 
 import pandas as pd
 import csv
+import io
 import time
 import logging
 import matplotlib.pyplot as plt
 import seaborn as sns
-import boto3
+from botocore.exceptions import ClientError
+from s3_transfer import get_s3_service
+from app_metrics import MetricsRegistry, PROMETHEUS_CONTENT_TYPE, instrument_s3_client, profiled
 import os
 import hashlib
+import heapq
+import json
+import math
+import numbers
+import pickle
+import shutil
 import secrets
-from flask import Flask, render_template, request, send_from_directory, Response
+import threading
+import uuid
+import fcntl
+import mimetypes
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Blueprint, render_template, request, Response, jsonify, stream_with_context, g
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,21 +36,113 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # AWS S3 Configuration
 S3_BUCKET_NAME = "alexas-ec2-cost-analysis-bucket"  # Name of the S3 bucket
 S3_FILE_NAME = "ec2_analysis.csv"  # Name of the CSV file in S3
+RESULTS_TYPED_FILE = "ec2_analysis.jsonl"  # Typed results (raw numerics); a .parquet name writes Parquet
+S3_TYPED_FILE_NAME = RESULTS_TYPED_FILE  # Name of the typed results file in S3
 S3_VISUALIZATIONS_PREFIX = "visualizations/"  # Prefix for visualization files in S3
 S3_REGION = "us-east-1"  # AWS region for S3
+RESULT_CONTENT_TYPES = {".csv": "text/csv", ".jsonl": "application/x-ndjson",
+                        ".parquet": "application/vnd.apache.parquet"}  # Content types of the result files
 
 # Password Protection
 PASSWORD_HASH = hashlib.sha256("myStrongPassword123!".encode()).hexdigest()  # Hash of the password
 SALT = secrets.token_hex(16)  # Generate a random salt
 PASSWORD_HASH = hashlib.sha256((PASSWORD_HASH + SALT).encode()).hexdigest()  # Hash the password with the salt
 
-# Flask App
-app = Flask(__name__)
+# Out-of-core analysis
+EC2_CHUNK_ROWS = 250_000  # Rows per chunk when analyzing large inventories
+EC2_IN_MEMORY_LIMIT_BYTES = 512 * 1024 * 1024  # Larger input files are analyzed chunk by chunk
+
+# Background analysis jobs
+EC2_DATA_FILE = "ec2_data.csv"  # Fleet inventory analyzed by /run_analysis
+ANALYSIS_WORKERS = 2  # Background threads running analysis jobs
+MAX_TRACKED_JOBS = 100  # Finished jobs kept for /jobs/<job_id>
+_job_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="ec2-analysis")
+_jobs = OrderedDict()  # job_id -> job record, oldest first
+_active_jobs = {}  # input fingerprint -> job_id of the queued/running job for it
+_jobs_lock = threading.Lock()
+_publish_lock = threading.Lock()
+
+# Streaming downloads
+DOWNLOAD_CHUNK_SIZE = 64 * 1024  # Bytes per chunk streamed from S3 to the client
+OBJECT_METADATA_TTL_SECONDS = 30  # How long HEAD results for downloadable objects are reused
+_object_metadata_cache = {}  # S3 key -> {"etag", "size", "content_type", "fetched_at"}
+_object_metadata_lock = threading.Lock()
+
+# Visualization cache
+VISUALIZATION_CACHE_MAX_BYTES = 32 * 1024 * 1024  # Chart bytes kept in memory (LRU)
+VISUALIZATION_REVALIDATE_SECONDS = 30  # Serve cached charts this long before checking the S3 ETag again
+VISUALIZATION_CACHE_CONTROL = "private, max-age=60, must-revalidate"  # Browser caching for charts
+_visualization_cache = OrderedDict()  # S3 key -> {"etag", "body", "content_type", "checked_at"}
+_visualization_cache_bytes = 0
+_visualization_cache_lock = threading.Lock()
+
+# Persistent result cache
+RESULT_CACHE_DIR = "ec2_result_cache"  # Analysis dict, results CSV and charts per input version
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Least recently used entries are evicted past this size
+RESULT_CACHE_INDEX_FILE = os.path.join(RESULT_CACHE_DIR, "index.json")
+RESULT_CACHE_LOCK_FILE = os.path.join(RESULT_CACHE_DIR, "index.lock")  # flock()ed by every index update
+_result_cache_lock = threading.Lock()
+
+# Instrumentation (exposed at /metrics)
+PROFILE_PIPELINE = os.environ.get("EC2_PROFILE_PIPELINE", "0") == "1"  # cProfile each analysis job
+PROFILE_OUTPUT_DIR = "profiles"  # Where .prof files are written when profiling is on
+metrics = MetricsRegistry()
+metrics.histogram("http_request_duration_seconds", "Flask request latency by route, method and status.")
+metrics.histogram("pipeline_stage_duration_seconds", "Analysis pipeline stage duration.")
+metrics.histogram("chart_render_duration_seconds", "Render time per chart.")
+metrics.histogram("analysis_job_duration_seconds", "End-to-end analysis job duration.")
+metrics.counter("analysis_runs_total", "Analysis pipeline runs by outcome (computed, cached, failed).")
+
+# Flask routes, registered on each app built by create_app()
+routes = Blueprint("ec2_costs", __name__)
+_bucket_ready = False  # Set once HeadBucket (or creation) succeeded in this process
+_bucket_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def s3_service():
+    """Shared S3 service for S3_REGION, with its client instrumented for /metrics."""
+    service = get_s3_service(S3_REGION)
+    instrument_s3_client(service.client, metrics)
+    return service
+
+os.register_at_fork(after_in_child=s3_service.cache_clear)  # Forked WSGI workers build their own client
+
+def _stage(name):
+    return metrics.timer("pipeline_stage_duration_seconds", stage=name)
 
 # --- Analysis Functions ---
+_COLUMN_NAME_DELETIONS = str.maketrans("", "", " $()%")  # Characters dropped from column names
+CURRENCY_COLUMNS = ("monthlycost", "estimatedsavings")  # Columns exported as "$1,234.56" strings
+NUMERIC_COLUMNS = ("avgcpu", "runtimedays")  # Columns that may arrive as object dtype (e.g. all None)
+
+def standardize_column_name(col):
+    return str(col).strip().lower().translate(_COLUMN_NAME_DELETIONS)  # e.g. "Monthly Cost ($)" -> "monthlycost"
+
+def find_column(columns, name):
+    return next((col for col in columns if name in col), None)  # First column containing ``name``
+
+def parse_currency_column(series):
+    """Converts "$1,234.56" strings to floats; numeric columns are returned unchanged."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    text = series if pd.api.types.is_string_dtype(series) else series.astype(str)
+    return pd.to_numeric(text.str.replace("$", "", regex=False).str.replace(",", "", regex=False), errors='coerce')
+
+def prepare_ec2_frame(df):
+    """Standardizes column names and parses the currency and numeric columns in place, once per frame."""
+    df.columns = [standardize_column_name(col) for col in df.columns]  # Standardize column names
+    for name in CURRENCY_COLUMNS:
+        col = find_column(df.columns, name)
+        if col is not None:
+            df[col] = parse_currency_column(df[col])
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce')  # None -> NaN, so sums/counts stay float
+    return df
+
 def read_data_from_csv(csv_file):
     try:
-        df = pd.read_csv(csv_file)  # Read CSV file into a Pandas DataFrame
+        df = prepare_ec2_frame(pd.read_csv(csv_file))  # Read CSV file and parse currency columns at load
         logging.info(f"Read CSV file: {csv_file} (Shape: {df.shape})")
         return df
     except FileNotFoundError:
@@ -43,13 +152,9 @@ def read_data_from_csv(csv_file):
         logging.error(f"Failed to read CSV '{csv_file}': {e}")
         return pd.DataFrame()
 
-def analyze_ec2_costs(df):
-    analysis = {}
-    if df.empty:
-        logging.error("DataFrame is empty for analysis. Analysis aborted.")
-        return analysis
-
-    df.columns = [str(col).strip().lower().replace(" ", "").replace("$", "").replace("(", "").replace(")", "").replace("%", "") for col in df.columns]  # Standardize column names
+def _ec2_partial_aggregates(df):
+    """Reduces one frame (or one chunk of a larger file) to mergeable counts, sums and value counts."""
+    prepare_ec2_frame(df)  # No-op for frames from read_data_from_csv
     logging.debug(f"Standardized DataFrame Columns: {df.columns.tolist()}")
 
     runtime_col = "runtimedays"
@@ -57,45 +162,162 @@ def analyze_ec2_costs(df):
     cost_col = "monthlycost"
     savings_col = "estimatedsavings"
     cpu_col = "avgcpu"
+    type_col = "instancetype"
+    region_col = "region"
+
+    partial = {"rows": len(df), "cost_col": find_column(df.columns, cost_col),
+               "savings_col": find_column(df.columns, savings_col),
+               "has_runtime": runtime_col in df.columns, "has_cpu": cpu_col in df.columns}
+
+    running = df[runtime_col] > 0 if partial["has_runtime"] else None  # Boolean masks, no row subsets are copied
+    partial["running"] = int(running.sum()) if partial["has_runtime"] else 0
+    partial["not_running"] = int((df[runtime_col] == 0).sum()) if partial["has_runtime"] else 0
+    if partial["cost_col"]:
+        cost = df[partial["cost_col"]]
+        partial["cost_running"] = cost.where(running).sum() if partial["has_runtime"] else 0
+
+    # One grouped aggregation over (instance type, region) feeds every per-type and per-region metric
+    group_cols = [col for col in (type_col, region_col) if col in df.columns]
+    aggregations = {"instances": (group_cols[0], "size")} if group_cols else {}
+    if partial["cost_col"]:
+        aggregations.update(cost_sum=(partial["cost_col"], "sum"), cost_count=(partial["cost_col"], "count"))
+    if partial["has_cpu"]:
+        aggregations.update(cpu_sum=(cpu_col, "sum"), cpu_count=(cpu_col, "count"))
+    partial["grouped"] = df.groupby(group_cols, dropna=False, observed=True, sort=False).agg(**aggregations) if group_cols else None
+
+    partial["low_cpu"] = int((df[cpu_col] < 20).sum()) if partial["has_cpu"] else 0
+    partial["high_cpu"] = int((df[cpu_col] > 80).sum()) if partial["has_cpu"] else 0
+    partial["recommendations"] = df[recommendation_col].value_counts() if recommendation_col in df.columns else None
+    partial["savings_sum"] = df[partial["savings_col"]].sum() if partial["savings_col"] else 0
+    return partial
+
+def _merge_ec2_partials(left, right):
+    """Combines two results of ``_ec2_partial_aggregates`` as if they came from one frame."""
+    if left is None:
+        return right
+    merged = dict(left)
+    for key in ("rows", "running", "not_running", "cost_running", "low_cpu", "high_cpu", "savings_sum"):
+        if key in left or key in right:
+            merged[key] = left.get(key, 0) + right.get(key, 0)
+    for key in ("cost_col", "savings_col"):
+        merged[key] = left[key] or right[key]
+    for key in ("has_runtime", "has_cpu"):
+        merged[key] = left[key] or right[key]
+    grouped = [g for g in (left["grouped"], right["grouped"]) if g is not None]
+    if len(grouped) == 2:
+        levels = list(range(grouped[0].index.nlevels))
+        merged["grouped"] = pd.concat(grouped).groupby(level=levels, dropna=False, sort=False).sum()
+    else:
+        merged["grouped"] = grouped[0] if grouped else None
+    counts = [c for c in (left["recommendations"], right["recommendations"]) if c is not None]
+    if len(counts) == 2:
+        merged["recommendations"] = counts[0].add(counts[1], fill_value=0).astype("int64").sort_values(ascending=False, kind="stable")
+    else:
+        merged["recommendations"] = counts[0] if counts else None
+    return merged
 
-    analysis["total_ec2_running"] = len(df[df[runtime_col] > 0]) if runtime_col in df.columns else 0  # Count running EC2 instances
-    analysis["total_ec2_not_running"] = len(df[df[runtime_col] == 0]) if runtime_col in df.columns else 0  # Count non-running EC2 instances
+def _finalize_ec2_analysis(partial):
+    """Builds the analysis dict from (possibly merged) partial aggregates."""
+    analysis = {}
+    type_col = "instancetype"
+    region_col = "region"
+    cost_col_actual = partial["cost_col"]
+    savings_col_actual = partial["savings_col"]
 
-    cost_col_actual = next((col for col in df.columns if cost_col in col), None)  # Find the actual cost column
+    analysis["total_ec2_running"] = partial["running"]  # Count running EC2 instances
+    analysis["total_ec2_not_running"] = partial["not_running"]  # Count non-running EC2 instances
     if cost_col_actual:
-        df[cost_col_actual] = pd.to_numeric(df[cost_col_actual].astype(str).replace(r'[$,]', '', regex=True), errors='coerce')  # Convert cost column to numeric
-        analysis["total_cost_running"] = df[df[runtime_col] > 0][cost_col_actual].sum() if runtime_col in df.columns else 0  # Calculate total cost of running instances
+        analysis["total_cost_running"] = partial["cost_running"]  # Calculate total cost of running instances
         logging.debug(f"Calculated total cost of running EC2s: {analysis.get('total_cost_running', 0):.2f}")
     else:
-        logging.warning(f"Column like '{cost_col}' not found for total cost analysis.")
+        logging.warning(f"Column like 'monthlycost' not found for total cost analysis.")
+
+    grouped = partial["grouped"]
+    group_levels = list(grouped.index.names) if grouped is not None else []
+    by_type = grouped.groupby(level=type_col).sum() if type_col in group_levels else None
+    by_region = grouped.groupby(level=region_col).sum() if region_col in group_levels else None
 
-    analysis["most_common_instance_types"] = df["instancetype"].value_counts().to_dict()  # Count instance types
-    analysis["avg_cost_per_instance_type"] = df.groupby("instancetype")[cost_col_actual].mean().to_dict() if cost_col_actual else {}  # Calculate average cost per instance type
-    analysis["avg_cpu_per_instance_type"] = df.groupby("instancetype")[cpu_col].mean().to_dict() if cpu_col in df.columns else {}  # Calculate average CPU per instance type
-    analysis["total_cost_per_region"] = df.groupby("region")[cost_col_actual].sum().to_dict() if cost_col_actual else {}  # Calculate total cost per region
+    analysis["most_common_instance_types"] = by_type["instances"].sort_values(ascending=False, kind="stable").to_dict() if by_type is not None else {}  # Count instance types
+    analysis["avg_cost_per_instance_type"] = (by_type["cost_sum"] / by_type["cost_count"]).to_dict() if cost_col_actual and by_type is not None else {}  # Calculate average cost per instance type
+    analysis["avg_cpu_per_instance_type"] = (by_type["cpu_sum"] / by_type["cpu_count"]).to_dict() if partial["has_cpu"] and by_type is not None else {}  # Calculate average CPU per instance type
+    analysis["total_cost_per_region"] = by_region["cost_sum"].to_dict() if cost_col_actual and by_region is not None else {}  # Calculate total cost per region
 
-    low_utilization_instances = df[df[cpu_col] < 20] if cpu_col in df.columns else pd.DataFrame()  # Find low utilization instances
-    high_utilization_instances = df[df[cpu_col] > 80] if cpu_col in df.columns else pd.DataFrame()  # Find high utilization instances
-    analysis["low_utilization_percentage"] = (len(low_utilization_instances) / len(df)) * 100 if len(df) > 0 else 0  # Calculate low utilization percentage
-    analysis["high_utilization_percentage"] = (len(high_utilization_instances) / len(df)) * 100 if len(df) > 0 else 0  # Calculate high utilization percentage
-    analysis["recommendation_breakdown"] = df[recommendation_col].value_counts().to_dict() if recommendation_col in df.columns else {}  # Count recommendations
+    rows = partial["rows"]
+    analysis["low_utilization_percentage"] = (partial["low_cpu"] / rows) * 100 if rows > 0 else 0  # Calculate low utilization percentage
+    analysis["high_utilization_percentage"] = (partial["high_cpu"] / rows) * 100 if rows > 0 else 0  # Calculate high utilization percentage
+    analysis["recommendation_breakdown"] = partial["recommendations"].to_dict() if partial["recommendations"] is not None else {}  # Count recommendations
 
-    savings_col_actual = next((col for col in df.columns if savings_col in col), None)  # Find the actual savings column
+    total_savings = partial["savings_sum"]
     if savings_col_actual and cost_col_actual:
-        df[savings_col_actual] = pd.to_numeric(df[savings_col_actual].astype(str).replace(r'[$,]', '', regex=True), errors='coerce')  # Convert savings column to numeric
-        analysis["total_cost_with_savings"] = analysis.get("total_cost_running", 0) - df[savings_col_actual].sum()  # Calculate total cost with savings
+        analysis["total_cost_with_savings"] = analysis.get("total_cost_running", 0) - total_savings  # Calculate total cost with savings
         logging.debug(f"Calculated total cost with savings: {analysis.get('total_cost_with_savings', 0):.2f}")
     else:
         analysis["total_cost_with_savings"] = analysis.get("total_cost_running", 0)
 
     if analysis.get("total_cost_running", 0) > 0 and savings_col_actual:
-        analysis["potential_savings_percentage"] = (df[savings_col_actual].sum() / analysis["total_cost_running"]) * 100  # Calculate potential savings percentage
+        analysis["potential_savings_percentage"] = (total_savings / analysis["total_cost_running"]) * 100  # Calculate potential savings percentage
     else:
         analysis["potential_savings_percentage"] = 0
 
     return analysis
 
-def save_analysis_results_to_csv(analysis_results, csv_filename="ec2_analysis.csv"):
+def analyze_ec2_costs(df):
+    analysis = {}
+    if df.empty:
+        logging.error("DataFrame is empty for analysis. Analysis aborted.")
+        return analysis
+    return _finalize_ec2_analysis(_ec2_partial_aggregates(df))
+
+def analyze_ec2_costs_chunked(csv_file, chunksize=EC2_CHUNK_ROWS):
+    """Out-of-core ``analyze_ec2_costs``: reads ``csv_file`` in chunks and merges their partial aggregates.
+
+    Peak memory is bounded by ``chunksize`` rows plus the per-(type, region) groups, not by file size.
+    """
+    partial = None
+    try:
+        for chunk in pd.read_csv(csv_file, chunksize=chunksize):
+            partial = _merge_ec2_partials(partial, _ec2_partial_aggregates(chunk))
+    except FileNotFoundError:
+        logging.error(f"CSV file '{csv_file}' not found.")
+        return {}
+    except Exception as e:
+        logging.error(f"Failed to read CSV '{csv_file}': {e}")
+        return {}
+    if partial is None or partial["rows"] == 0:
+        logging.error("DataFrame is empty for analysis. Analysis aborted.")
+        return {}
+    logging.info(f"Analyzed CSV file in chunks: {csv_file} (Rows: {partial['rows']})")
+    return _finalize_ec2_analysis(partial)
+
+def _metric_unit(key):
+    """Classifies a metric by name: "currency", "percentage" or "number"."""
+    key = key.lower()
+    if "cost" in key:
+        return "currency"
+    if "percentage" in key:
+        return "percentage"
+    return "number"
+
+def _format_number(value, decimals=2):
+    return "{:,.{}f}".format(value, decimals)
+
+def _format_percentage(value, decimals=2):
+    return "{:,.{}f}%".format(value, decimals)
+
+def _format_currency(value, decimals=2):
+    return "${:,.{}f}".format(value, decimals)
+
+_METRIC_FORMATTERS = {"currency": _format_currency, "percentage": _format_percentage, "number": _format_number}
+
+def _top_n(dictionary, n):
+    """Largest ``n`` items by value, via a heap instead of sorting the whole dict."""
+    return heapq.nlargest(n, dictionary.items(), key=lambda item: item[1])
+
+def _by_value(dictionary):
+    return sorted(dictionary.items(), key=lambda item: item[1], reverse=True)
+
+def save_analysis_results_to_csv(analysis_results, csv_filename="ec2_analysis.csv", top_n=3):
+    """Writes the human-readable results CSV (formatted strings, top ``top_n`` instance types)."""
     if not analysis_results:
         logging.info("No analysis results to save.")
         return
@@ -105,140 +327,177 @@ def save_analysis_results_to_csv(analysis_results, csv_filename="ec2_analysis.cs
             writer = csv.writer(csvfile)
             writer.writerow(["Metric", "Value"])
 
-            def format_number(value, decimals=2):
-                return "{:,.{}f}".format(value, decimals)
-
-            def format_percentage(value, decimals=2):
-                return "{:,.{}f}%".format(value, decimals)
-
-            def format_currency(value, decimals=2):
-                return "${:,.{}f}".format(value, decimals)
-
-            def sort_dict_by_value(dictionary, reverse=True):
-                return dict(sorted(dictionary.items(), key=lambda item: item[1], reverse=reverse))
-
             for key, value in analysis_results.items():
-                if isinstance(value, (int, float)):
-                    if "cost" in key.lower():
-                        writer.writerow([key, format_currency(value)])
-                    elif "percentage" in key.lower():
-                        writer.writerow([key, format_percentage(value)])
-                    else:
-                        writer.writerow([key, format_number(value)])
+                if isinstance(value, numbers.Real):
+                    writer.writerow([key, _METRIC_FORMATTERS[_metric_unit(key)](value)])
                 elif isinstance(value, dict):
-                    sorted_dict = sort_dict_by_value(value)
-                    if "instance type" in key.lower():
-                        top_n = 3
-                        for sub_key, sub_value in list(sorted_dict.items())[:top_n]:
+                    if "instance_type" in key.lower():
+                        for sub_key, sub_value in _top_n(value, top_n):
                             if "cost" in key.lower():
-                                writer.writerow([f"Average Cost ({sub_key})", format_currency(sub_value)])
+                                writer.writerow([f"Average Cost ({sub_key})", _format_currency(sub_value)])
                             elif "cpu" in key.lower():
-                                writer.writerow([f"Average CPU ({sub_key})", format_number(sub_value)])
+                                writer.writerow([f"Average CPU ({sub_key})", _format_number(sub_value)])
                             else:
-                                writer.writerow([f"Most Common Instance Type ({sub_key})", format_number(sub_value)])
+                                writer.writerow([f"Most Common Instance Type ({sub_key})", _format_number(sub_value)])
                     elif "region" in key.lower():
-                        for sub_key, sub_value in sorted_dict.items():
-                            writer.writerow([f"Total Cost Per Region ({sub_key})", format_currency(sub_value)])
+                        for sub_key, sub_value in _by_value(value):
+                            writer.writerow([f"Total Cost Per Region ({sub_key})", _format_currency(sub_value)])
                     elif "recommendation" in key.lower():
-                        for sub_key, sub_value in sorted_dict.items():
-                            writer.writerow([f"Recommendation Breakdown ({sub_key})", format_number(sub_value)])
+                        for sub_key, sub_value in _by_value(value):
+                            writer.writerow([f"Recommendation Breakdown ({sub_key})", _format_number(sub_value)])
                 else:
                     writer.writerow([key, str(value)])
         logging.info(f"Analysis results saved to '{csv_filename}'")
     except Exception as e:
         logging.error(f"Could not save analysis results to CSV '{csv_filename}': {e}")
 
-def generate_visualizations(df):
-    logging.info("generate_visualizations() called.")
+def _raw_number(value):
+    if isinstance(value, numbers.Integral):
+        return int(value)  # Plain Python types for JSON
+    value = float(value)
+    return value if math.isfinite(value) else None  # JSON has no NaN/Infinity: written as null
+
+def analysis_result_records(analysis_results):
+    """Flattens the analysis dict into typed records: ``{"metric", "key", "value", "unit"}``.
+
+    Scalars get ``key=None``; dict metrics get one record per entry (all of them, unsorted).
+    Values stay raw floats/ints so consumers never parse formatted strings; NaN and infinities become None.
+    """
+    records = []
+    for metric, value in analysis_results.items():
+        if isinstance(value, dict):
+            unit = "currency" if "cost" in metric.lower() else "number"
+            records.extend({"metric": metric, "key": str(sub_key), "value": _raw_number(sub_value), "unit": unit}
+                           for sub_key, sub_value in value.items())
+        elif isinstance(value, numbers.Real):
+            records.append({"metric": metric, "key": None, "value": _raw_number(value), "unit": _metric_unit(metric)})
+    return records
+
+def save_analysis_results_typed(analysis_results, path=RESULTS_TYPED_FILE):
+    """Writes machine-readable results next to the pretty CSV: JSON Lines, or Parquet for ``.parquet`` paths."""
+    if not analysis_results:
+        logging.info("No analysis results to save.")
+        return False
+    records = analysis_result_records(analysis_results)
+    try:
+        if path.endswith(".parquet"):
+            pd.DataFrame.from_records(records, columns=["metric", "key", "value", "unit"]).to_parquet(path, index=False)
+        else:
+            with open(path, "w") as f:
+                for record in records:
+                    f.write(json.dumps(record, allow_nan=False) + "\n")  # Strict JSON, parseable everywhere
+        logging.info(f"Typed analysis results saved to '{path}' ({len(records)} records)")
+        return True
+    except Exception as e:
+        logging.error(f"Could not save typed analysis results to '{path}': {e}")
+        return False
+
+def _figure_png():
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format="png")  # Render the current figure straight into memory
+    return buffer.getvalue()
+
+def render_visualizations(df):
+    """Renders the dashboard charts and returns ``{S3 key: PNG bytes}``."""
+    logging.info("render_visualizations() called.")
+    charts = {}
     if df.empty:
         logging.warning("DataFrame is empty. Cannot generate visualizations.")
-        return
+        return charts
 
-    if not os.access(".", os.W_OK):  # Check write permissions
-        logging.error("No write permissions in the current directory.")
-        return
-
-    df.columns = [str(col).strip().lower().replace(" ", "").replace("$", "").replace("(", "").replace(")", "").replace("%", "") for col in df.columns]  # Standardize column names
-    print(f"DataFrame Columns after standardization: {df.columns}")
+    prepare_ec2_frame(df)  # Standardize column names and parse currency columns
+    logging.debug(f"DataFrame Columns after standardization: {df.columns}")
 
     if "instancetype" not in df.columns or "region" not in df.columns or "monthlycost" not in df.columns or "avgcpu" not in df.columns or "recommendation" not in df.columns:
         logging.error("Required columns not found in DataFrame after standardization. Cannot generate visualizations.")
-        return
-
-    plt.figure(figsize=(10, 6))
-    sns.countplot(y="instancetype", data=df, order=df["instancetype"].value_counts().index[:10], palette="pastel", hue="instancetype", legend=False)
-    try:
-        print(f"local file exists: {os.path.exists('instance_type_distribution.png')}")
-        plt.savefig("instance_type_distribution.png")
-        logging.info("instance_type_distribution.png saved locally.")
-        upload_to_s3("instance_type_distribution.png", S3_VISUALIZATIONS_PREFIX + "instance_type_distribution.png")
-        logging.info("instance_type_distribution.png saved and uploaded successfully")
-    except Exception as e:
-        logging.error(f"Error saving/uploading instance_type_distribution.png: {e}")
-    plt.close()
-
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x="region", y="monthlycost", data=df, estimator=sum, palette="viridis", hue="region", legend=False)
-    try:
-        print(f"local file exists: {os.path.exists('cost_per_region.png')}")
-        plt.savefig("cost_per_region.png")
-        logging.info("cost_per_region.png saved locally.")
-        upload_to_s3("cost_per_region.png", S3_VISUALIZATIONS_PREFIX + "cost_per_region.png")
-        logging.info("cost_per_region.png saved and uploaded successfully")
-    except Exception as e:
-        logging.error(f"Error saving/uploading cost_per_region.png: {e}")
-        print(f"Error during cost_per_region saving: {e}")  # Added print statement for debugging
-    plt.close()
-
-    plt.figure(figsize=(10, 6))
-    sns.histplot(df["avgcpu"], bins=20, kde=True, color="skyblue")
-    try:
-        print(f"local file exists: {os.path.exists('cpu_utilization_distribution.png')}")
-        plt.savefig("cpu_utilization_distribution.png")
-        logging.info("cpu_utilization_distribution.png saved locally.")
-        upload_to_s3("cpu_utilization_distribution.png", S3_VISUALIZATIONS_PREFIX + "cpu_utilization_distribution.png")
-        logging.info("cpu_utilization_distribution.png saved and uploaded successfully")
-    except Exception as e:
-        logging.error(f"Error saving/uploading cpu_utilization_distribution.png: {e}")
-        print(f"Error during cpu_utilization_distribution saving: {e}")  # Added print statement for debugging
-    plt.close()
+        return charts
+
+    with metrics.timer("chart_render_duration_seconds", chart="instance_type_distribution"):
+        plt.figure(figsize=(10, 6))
+        sns.countplot(y="instancetype", data=df, order=df["instancetype"].value_counts().index[:10], palette="pastel", hue="instancetype", legend=False)
+        try:
+            charts[S3_VISUALIZATIONS_PREFIX + "instance_type_distribution.png"] = _figure_png()
+            logging.info("instance_type_distribution.png rendered.")
+        except Exception as e:
+            logging.error(f"Error rendering instance_type_distribution.png: {e}")
+        plt.close()
+
+    with metrics.timer("chart_render_duration_seconds", chart="cost_per_region"):
+        plt.figure(figsize=(10, 6))
+        sns.barplot(x="region", y="monthlycost", data=df, estimator=sum, palette="viridis", hue="region", legend=False)
+        try:
+            charts[S3_VISUALIZATIONS_PREFIX + "cost_per_region.png"] = _figure_png()
+            logging.info("cost_per_region.png rendered.")
+        except Exception as e:
+            logging.error(f"Error rendering cost_per_region.png: {e}")
+        plt.close()
+
+    with metrics.timer("chart_render_duration_seconds", chart="cpu_utilization_distribution"):
+        plt.figure(figsize=(10, 6))
+        sns.histplot(df["avgcpu"], bins=20, kde=True, color="skyblue")
+        try:
+            charts[S3_VISUALIZATIONS_PREFIX + "cpu_utilization_distribution.png"] = _figure_png()
+            logging.info("cpu_utilization_distribution.png rendered.")
+        except Exception as e:
+            logging.error(f"Error rendering cpu_utilization_distribution.png: {e}")
+        plt.close()
+
+    with metrics.timer("chart_render_duration_seconds", chart="recommendation_breakdown"):
+        plt.figure(figsize=(8, 5))
+        sns.countplot(x="recommendation", data=df, palette="Set2", hue="recommendation", legend=False)
+        try:
+            charts[S3_VISUALIZATIONS_PREFIX + "recommendation_breakdown.png"] = _figure_png()
+            logging.info("recommendation_breakdown.png rendered.")
+        except Exception as e:
+            logging.error(f"Error rendering recommendation_breakdown.png: {e}")
+        plt.close()
+
+    return charts
+
+def upload_visualizations(charts):
+    """Uploads ``{S3 key: PNG bytes}`` concurrently; returns True when every chart was uploaded."""
+    png_args = {"ContentType": "image/png"}
+    uploads = [(io.BytesIO(body), key, png_args) for key, body in charts.items()]
+    results = s3_service().upload_many(uploads, S3_BUCKET_NAME)  # Upload all charts concurrently
+    forget_visualizations(charts)  # This worker must serve the new charts, not its cached copies
+    logging.info(f"Uploaded {sum(error is None for error in results.values())}/{len(uploads)} visualizations to S3")
+    return all(error is None for error in results.values())
 
-    plt.figure(figsize=(8, 5))
-    sns.countplot(x="recommendation", data=df, palette="Set2", hue="recommendation", legend=False)
-    try:
-        print(f"local file exists: {os.path.exists('recommendation_breakdown.png')}")
-        plt.savefig("recommendation_breakdown.png")
-        logging.info("recommendation_breakdown.png saved locally.")
-        upload_to_s3("recommendation_breakdown.png", S3_VISUALIZATIONS_PREFIX + "recommendation_breakdown.png")
-        logging.info("recommendation_breakdown.png saved and uploaded successfully")
-    except Exception as e:
-        logging.error(f"Error saving/uploading recommendation_breakdown.png: {e}")
-    plt.close()
+def generate_visualizations(df):
+    """Renders and uploads the dashboard charts; returns the rendered ``{S3 key: PNG bytes}``."""
+    charts = render_visualizations(df)
+    if charts:
+        upload_visualizations(charts)
+    return charts
 
 # --- S3 Upload Function ---
+def result_content_type(key):
+    """Returns the content type a result file is stored and served with, from its extension."""
+    return RESULT_CONTENT_TYPES.get(os.path.splitext(key)[1].lower(), "application/octet-stream")
+
 def upload_to_s3(file_name, object_name=None):
     if object_name is None:
         object_name = file_name
 
-    s3_client = boto3.client('s3', region_name=S3_REGION)
     try:
         logging.info(f"Attempting to upload '{file_name}' to S3: {S3_BUCKET_NAME}/{object_name}")
-        s3_client.upload_file(file_name, S3_BUCKET_NAME, object_name)
+        extra_args = {"ContentType": result_content_type(object_name)}  # S3 would otherwise store binary/octet-stream
+        s3_service().upload_file(file_name, S3_BUCKET_NAME, object_name, extra_args)
+        with _object_metadata_lock:
+            _object_metadata_cache.pop(object_name, None)  # Downloads must see the new version
         logging.info(f"File '{file_name}' uploaded to S3: {S3_BUCKET_NAME}/{object_name}")
+        return True
     except Exception as e:
-        logging.error(f"Error uploading file '{file_name}' to S3: {e}")
-        print(f"Upload error: {e}")
-        print(f"File path that was attempted to upload: {file_name}")
-        print(f"S3 path that was attempted to use: {S3_BUCKET_NAME}/{object_name}")
+        logging.error(f"Error uploading file '{file_name}' to S3: {S3_BUCKET_NAME}/{object_name}: {e}")
+        return False
 
 # --- S3 Bucket Creation ---
 def create_s3_bucket(bucket_name, region=None):
     try:
+        s3_client = get_s3_service(region).client
         if region is None:
-            s3_client = boto3.client('s3')
             s3_client.create_bucket(Bucket=bucket_name)  # Create bucket in default region
         else:
-            s3_client = boto3.client('s3', region_name=region)
             if region == "us-east-1":
                 s3_client.create_bucket(Bucket=bucket_name)  # No location constraint for us-east-1
             else:
@@ -253,7 +512,24 @@ def create_s3_bucket(bucket_name, region=None):
         return False
 
 # --- Flask Routes ---
-@app.route("/", methods=["GET", "POST"])
+@routes.before_app_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@routes.after_app_request
+def _record_request_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None:  # Streamed downloads are measured up to the first byte
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe("http_request_duration_seconds", time.perf_counter() - started,
+                        route=route, method=request.method, status=response.status_code)
+    return response
+
+@routes.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@routes.route("/", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         password = request.form["password"]
@@ -264,79 +540,473 @@ def login():
             return "Incorrect password."
     return render_template("login.html")
 
-@app.route("/download")
+@routes.route("/download")
 def download_file():
-    s3_client = boto3.client('s3', region_name=S3_REGION)
     try:
-        s3_client.download_file(S3_BUCKET_NAME, S3_FILE_NAME, "downloaded_ec2_analysis.csv")  # Download file from S3
-        return send_from_directory(".", "downloaded_ec2_analysis.csv", as_attachment=True)
-    except Exception as e:
-        return f"Error downloading file: {e}"
-
-@app.route("/visualizations/<filename>")
+        metadata = get_object_metadata(S3_FILE_NAME)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return "Analysis results not found. Run the analysis first.", 404
+        return f"Error downloading file: {e}", 502
+
+    range_header = request.headers.get("Range")
+    if range_header is None and metadata["etag"] in request.if_none_match:
+        not_modified = Response(status=304)
+        not_modified.set_etag(metadata["etag"])
+        return not_modified  # Client copy is current, no S3 GET needed
+
+    params = {"Bucket": S3_BUCKET_NAME, "Key": S3_FILE_NAME}
+    if range_header:
+        params["Range"] = range_header  # S3 serves the byte range, the response is a 206
+    try:
+        obj = s3_service().client.get_object(**params)
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "InvalidRange":
+            return Response(status=416, headers={"Content-Range": f"bytes */{metadata['size']}"})
+        return f"Error downloading file: {e}", 502
+
+    body = obj["Body"]
+
+    def generate():
+        try:
+            for chunk in body.iter_chunks(chunk_size=DOWNLOAD_CHUNK_SIZE):  # Stream S3 -> client, bounded memory
+                yield chunk
+        finally:
+            body.close()
+
+    headers = {
+        "Content-Length": str(obj["ContentLength"]),
+        "Accept-Ranges": "bytes",
+        "ETag": obj["ETag"],
+        "Content-Disposition": f"attachment; filename={S3_FILE_NAME}",
+    }
+    if "ContentRange" in obj:
+        headers["Content-Range"] = obj["ContentRange"]
+    return Response(stream_with_context(generate()), status=206 if "ContentRange" in obj else 200,
+                    headers=headers, mimetype=result_content_type(S3_FILE_NAME))  # Older uploads have no stored type
+
+def get_object_metadata(key):
+    """Returns cached ``{"etag", "size", "content_type"}`` for an S3 object, refreshed after a short TTL."""
+    with _object_metadata_lock:
+        cached = _object_metadata_cache.get(key)
+        if cached is not None and time.time() - cached["fetched_at"] < OBJECT_METADATA_TTL_SECONDS:
+            return cached
+    head = s3_service().client.head_object(Bucket=S3_BUCKET_NAME, Key=key)
+    metadata = {"etag": head["ETag"].strip('"'), "size": head["ContentLength"],
+                "content_type": head.get("ContentType"), "fetched_at": time.time()}
+    with _object_metadata_lock:
+        _object_metadata_cache[key] = metadata
+    return metadata
+
+@routes.route("/visualizations/<filename>")
 def get_visualization(filename):
-    s3_client = boto3.client('s3', region_name=S3_REGION)
-    local_filename = f"temp_{filename}"
     try:
-        s3_client.download_file(S3_BUCKET_NAME, S3_VISUALIZATIONS_PREFIX + filename, local_filename)  # Download visualization from S3
-        return send_from_directory(".", local_filename, as_attachment=False)
+        etag, body, content_type = fetch_visualization(filename)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return f"Visualization '{filename}' not found.", 404
+        return f"Error downloading visualization: {e}", 502
     except Exception as e:
-        return f"Error downloading visualization: {e}"
-
-@app.route("/run_analysis")
+        return f"Error downloading visualization: {e}", 502
+
+    response = Response(body, mimetype=content_type)  # Served from memory, no temp file
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = VISUALIZATION_CACHE_CONTROL
+    return response.make_conditional(request)  # 304 when If-None-Match matches the ETag
+
+# --- Visualization Cache ---
+def fetch_visualization(filename):
+    """Returns ``(etag, bytes, content_type)`` for a chart, from the LRU cache when it is still current.
+
+    Entries younger than ``VISUALIZATION_REVALIDATE_SECONDS`` are served without touching S3; older
+    ones are revalidated with a conditional GET, which only transfers the body if the ETag changed.
+    """
+    global _visualization_cache_bytes
+    key = S3_VISUALIZATIONS_PREFIX + filename
+    with _visualization_cache_lock:
+        entry = _visualization_cache.get(key)
+        if entry is not None:
+            _visualization_cache.move_to_end(key)  # Most recently used
+            if time.time() - entry["checked_at"] < VISUALIZATION_REVALIDATE_SECONDS:
+                return entry["etag"], entry["body"], entry["content_type"]
+
+    s3 = s3_service().client
+    try:
+        if entry is None:
+            obj = s3.get_object(Bucket=S3_BUCKET_NAME, Key=key)
+        else:
+            obj = s3.get_object(Bucket=S3_BUCKET_NAME, Key=key, IfNoneMatch=entry["etag"])
+    except ClientError as e:
+        if entry is not None and e.response["Error"]["Code"] in ("304", "NotModified"):
+            with _visualization_cache_lock:
+                entry["checked_at"] = time.time()  # Unchanged in S3, keep serving the cached bytes
+            return entry["etag"], entry["body"], entry["content_type"]
+        raise
+
+    entry = {
+        "etag": obj["ETag"].strip('"'),
+        "body": obj["Body"].read(),
+        "content_type": obj.get("ContentType") or mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        "checked_at": time.time(),
+    }
+    with _visualization_cache_lock:
+        previous = _visualization_cache.pop(key, None)
+        if previous is not None:
+            _visualization_cache_bytes -= len(previous["body"])
+        if len(entry["body"]) <= VISUALIZATION_CACHE_MAX_BYTES:
+            _visualization_cache[key] = entry
+            _visualization_cache_bytes += len(entry["body"])
+            while _visualization_cache_bytes > VISUALIZATION_CACHE_MAX_BYTES:  # Evict least recently used
+                _, evicted = _visualization_cache.popitem(last=False)
+                _visualization_cache_bytes -= len(evicted["body"])
+    return entry["etag"], entry["body"], entry["content_type"]
+
+def forget_visualizations(keys):
+    """Drops the S3 ``keys`` from the chart cache after they were re-uploaded, so the next request refetches them."""
+    global _visualization_cache_bytes
+    with _visualization_cache_lock:
+        for key in keys:
+            entry = _visualization_cache.pop(key, None)
+            if entry is not None:
+                _visualization_cache_bytes -= len(entry["body"])
+
+@routes.route("/run_analysis")
 def run_analysis():
-    print("run_analysis() called!")
-    start_time = time.time()
-    csv_file = "ec2_data.csv"
-    df = read_data_from_csv(csv_file)
-
-    if not df.empty:
-        analysis_results = analyze_ec2_costs(df)
-        save_analysis_results_to_csv(analysis_results)
-        if os.path.exists("ec2_analysis.csv"):
-            logging.info("ec2_analysis.csv exists locally.")
+    job, created = submit_analysis_job(EC2_DATA_FILE)  # Returns at once, the pipeline runs in the background
+    with _jobs_lock:
+        response = _job_summary(job)
+    response["status_url"] = f"/jobs/{job['job_id']}"
+    response["deduplicated"] = not created
+    return jsonify(response), 202
+
+@routes.route("/cache/invalidate", methods=["POST"])
+def invalidate_cache():
+    removed = invalidate_result_cache(request.args.get("input"))  # No input: clear the whole cache
+    return jsonify({"invalidated": removed})
+
+@routes.route("/jobs/<job_id>")
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        summary = _job_summary(job) if job else None
+    if summary is None:
+        return jsonify({"error": f"Unknown job '{job_id}'"}), 404
+    return jsonify(summary)
+
+# --- Result Cache ---
+@lru_cache(maxsize=1)
+def analysis_code_version():
+    """Hash of this module's source, so any change to the analysis or chart code invalidates cached results."""
+    with open(os.path.abspath(__file__), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def _file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+@contextmanager
+def _result_cache_locked():
+    """Serializes index read-modify-write cycles across threads and across WSGI worker processes.
+
+    The thread lock covers this process; an exclusive ``flock`` on RESULT_CACHE_LOCK_FILE covers the
+    other gunicorn workers sharing the cache directory.
+    """
+    with _result_cache_lock:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        with open(RESULT_CACHE_LOCK_FILE, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # Released when the file is closed
+            yield
+
+def _load_result_cache_index():
+    try:
+        with open(RESULT_CACHE_INDEX_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"hashes": {}, "entries": {}, "published": None}
+
+def _save_result_cache_index(index):
+    os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{RESULT_CACHE_INDEX_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, RESULT_CACHE_INDEX_FILE)  # Atomic: readers never see a half-written index
+
+def result_cache_key(csv_file):
+    """Returns the cache key for the current version of ``csv_file``, or None if it can't be read.
+
+    The key combines the content hash and ``analysis_code_version()``. The content is only re-hashed
+    when the file's size or mtime changed since the last run, so an unchanged input costs one stat().
+    """
+    path = os.path.abspath(csv_file)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    with _result_cache_locked():
+        known = _load_result_cache_index()["hashes"].get(path)
+    if known and known["stamp"] == stamp:
+        content_hash = known["sha256"]
+    else:
+        content_hash = _file_sha256(path)  # Hashed outside the lock: large inputs take a while
+        with _result_cache_locked():
+            index = _load_result_cache_index()
+            index["hashes"][path] = {"stamp": stamp, "sha256": content_hash}
+            _save_result_cache_index(index)
+    return hashlib.sha256(f"{content_hash}:{stat.st_size}:{analysis_code_version()}".encode()).hexdigest()
+
+def load_cached_result(key):
+    """Returns ``(analysis_results, {S3 key: result file path}, {S3 key: chart path})`` for ``key``, or None on a miss."""
+    entry_dir = os.path.join(RESULT_CACHE_DIR, key)
+    with _result_cache_locked():
+        index = _load_result_cache_index()
+        entry = index["entries"].get(key)
+        if entry is None:
+            return None
+        try:
+            with open(os.path.join(entry_dir, "analysis.pkl"), "rb") as f:
+                analysis_results = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            logging.warning(f"Dropping unreadable result cache entry {key}")
+            _drop_result_cache_entry(index, key)
+            _save_result_cache_index(index)
+            return None
+        entry["last_used"] = time.time()
+        _save_result_cache_index(index)
+    charts = {S3_VISUALIZATIONS_PREFIX + name: os.path.join(entry_dir, "visualizations", name) for name in entry["charts"]}
+    result_files = {name: os.path.join(entry_dir, "results", name) for name in entry["results"]}
+    return analysis_results, result_files, charts
+
+def store_cached_result(key, csv_file, analysis_results, result_files, charts):
+    """Stores the analysis dict, ``{S3 key: result file path}`` and ``{S3 key: PNG bytes}`` under ``key``."""
+    entry_dir = os.path.join(RESULT_CACHE_DIR, key)
+    with _result_cache_locked():
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.makedirs(os.path.join(entry_dir, "visualizations"))
+        os.makedirs(os.path.join(entry_dir, "results"))
+        with open(os.path.join(entry_dir, "analysis.pkl"), "wb") as f:
+            pickle.dump(analysis_results, f, protocol=pickle.HIGHEST_PROTOCOL)
+        for s3_key, path in result_files.items():
+            shutil.copyfile(path, os.path.join(entry_dir, "results", s3_key))
+        names = []
+        for s3_key, body in charts.items():
+            name = os.path.basename(s3_key)
+            with open(os.path.join(entry_dir, "visualizations", name), "wb") as f:
+                f.write(body)
+            names.append(name)
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(entry_dir) for name in files)
+        index = _load_result_cache_index()
+        index["entries"][key] = {"input": os.path.abspath(csv_file), "bytes": size, "results": list(result_files),
+                                 "charts": names, "last_used": time.time()}
+        _evict_result_cache(index, keep=key)
+        _save_result_cache_index(index)
+
+def _drop_result_cache_entry(index, key):
+    index["entries"].pop(key, None)
+    if index.get("published") == key:
+        index["published"] = None
+    shutil.rmtree(os.path.join(RESULT_CACHE_DIR, key), ignore_errors=True)
+
+def _evict_result_cache(index, keep=None):
+    """Removes least recently used entries until the cache fits in RESULT_CACHE_MAX_BYTES."""
+    total = sum(entry["bytes"] for entry in index["entries"].values())
+    for key, entry in sorted(index["entries"].items(), key=lambda item: item[1]["last_used"]):
+        if total <= RESULT_CACHE_MAX_BYTES:
+            break
+        if key != keep:
+            total -= entry["bytes"]
+            _drop_result_cache_entry(index, key)
+
+def invalidate_result_cache(csv_file=None):
+    """Drops cached results for every version of ``csv_file``, or the whole cache when None.
+
+    Returns the number of entries removed. Call this when something outside the input and the code
+    changes the results, e.g. the bucket contents were modified by hand.
+    """
+    with _result_cache_locked():
+        index = _load_result_cache_index()
+        path = os.path.abspath(csv_file) if csv_file else None
+        keys = [key for key, entry in index["entries"].items() if path is None or entry["input"] == path]
+        for key in keys:
+            _drop_result_cache_entry(index, key)
+        if path is None:
+            index["hashes"], index["published"] = {}, None
         else:
-            logging.error("ec2_analysis.csv does not exist locally.")
-        upload_to_s3("ec2_analysis.csv", S3_FILE_NAME)  # Upload analysis results to S3
+            index["hashes"].pop(path, None)
+        _save_result_cache_index(index)
+    logging.info(f"Invalidated {len(keys)} result cache entries for '{csv_file or 'all inputs'}'")
+    return len(keys)
+
+def _published_result_key():
+    with _result_cache_locked():
+        return _load_result_cache_index().get("published")
+
+def _mark_result_published(key):
+    """Records which cache entry S3 currently holds; None when unknown (uncached or partial upload)."""
+    with _result_cache_locked():
+        index = _load_result_cache_index()
+        index["published"] = key  # S3 now holds exactly this entry's results CSV and charts
+        _save_result_cache_index(index)
+
+# --- Background Analysis Jobs ---
+def run_analysis_pipeline(csv_file=EC2_DATA_FILE, use_cache=True):
+    """Reads, analyzes and publishes ``csv_file``: results CSV plus charts, all uploaded to S3.
+
+    Results are cached per input version (see ``result_cache_key``). A cached result is re-uploaded
+    only if S3 currently holds a different one, so re-running an unchanged input writes nothing.
+    """
+    start_time = time.time()
+    if not ensure_s3_bucket():
+        raise RuntimeError(f"S3 bucket '{S3_BUCKET_NAME}' is not available.")
+    with _stage("cache_lookup"):
+        cache_key = result_cache_key(csv_file) if use_cache else None
+        cached = load_cached_result(cache_key) if cache_key else None
+    if cached is not None:
+        _, result_files, chart_files = cached
+        with _publish_lock:
+            if _published_result_key() == cache_key:
+                logging.info(f"Results for '{csv_file}' are unchanged and already in S3; skipped S3 writes")
+            else:
+                with _stage("upload"):
+                    published = all([upload_to_s3(path, s3_key) for s3_key, path in result_files.items()])
+                    uploads = [(path, key, {"ContentType": "image/png"}) for key, path in chart_files.items()]
+                    if uploads:
+                        results = s3_service().upload_many(uploads, S3_BUCKET_NAME)
+                        forget_visualizations(chart_files)
+                        published = published and all(error is None for error in results.values())
+                _mark_result_published(cache_key if published else None)  # A partial upload leaves S3 mixed
+                logging.info(f"Published cached results for '{csv_file}' to S3")
+        metrics.inc("analysis_runs_total", outcome="cached")
+        logging.info(f"Analysis pipeline for '{csv_file}' served from cache in {time.time() - start_time:.2f}s")
+        return "Analysis unchanged; cached results are in S3."
+
+    if os.path.exists(csv_file) and os.path.getsize(csv_file) > EC2_IN_MEMORY_LIMIT_BYTES:
+        df = None  # Too large to load: aggregate chunk by chunk
+        with _stage("analyze_chunked"):  # Reading and analyzing are interleaved per chunk
+            analysis_results = analyze_ec2_costs_chunked(csv_file)
+        if not analysis_results:
+            raise ValueError("DataFrame is empty.")
+    else:
+        with _stage("read"):
+            df = read_data_from_csv(csv_file)
+        if df.empty:
+            raise ValueError("DataFrame is empty.")
+        with _stage("analyze"):
+            analysis_results = analyze_ec2_costs(df)
+
+    with _publish_lock:  # The local results file and pyplot state are shared between workers
+        with _stage("save"):
+            save_analysis_results_to_csv(analysis_results)
+            save_analysis_results_typed(analysis_results)  # Raw numerics for dashboards, next to the pretty CSV
+        result_files = {S3_FILE_NAME: "ec2_analysis.csv", S3_TYPED_FILE_NAME: RESULTS_TYPED_FILE}
+        with _stage("upload"):
+            published = all([upload_to_s3(path, s3_key) for s3_key, path in result_files.items()])  # Upload analysis results to S3
         logging.info(f"Uploaded ec2_analysis.csv to S3")
-        generate_visualizations(df)  # Generate and upload visualizations
-        logging.info(f"Generated and uploaded visualizations to s3")
-        if os.path.exists("instance_type_distribution.png"):
-            logging.info("instance_type_distribution.png exists locally.")
-        else:
-            logging.error("instance_type_distribution.png does not exist locally.")
-        if os.path.exists("cost_per_region.png"):
-            logging.info("cost_per_region.png exists locally.")
-        else:
-            logging.error("cost_per_region.png does not exist locally.")
-        if os.path.exists("cpu_utilization_distribution.png"):
-            logging.info("cpu_utilization_distribution.png exists locally.")
+        charts = {}
+        if df is not None:
+            with _stage("charts"):
+                charts = render_visualizations(df)
+            with _stage("upload"):
+                published = upload_visualizations(charts) and published  # Upload the rendered charts
+            logging.info(f"Generated and uploaded visualizations to s3")
         else:
-            logging.error("cpu_utilization_distribution.png does not exist locally.")
-        if os.path.exists("recommendation_breakdown.png"):
-            logging.info("recommendation_breakdown.png exists locally.")
-        else:
-            logging.error("recommendation_breakdown.png does not exist locally.")
-        return "Analysis completed and results uploaded to S3."
-    else:
-        return "Error: DataFrame is empty."
-
-# --- Test S3 Connectivity ---
-def test_s3_connectivity():
-    s3 = boto3.client('s3')
+            logging.warning(f"Skipped visualizations: '{csv_file}' was analyzed out of core")
+        if cache_key:
+            with _stage("cache_store"):
+                store_cached_result(cache_key, csv_file, analysis_results, result_files, charts)
+        _mark_result_published(cache_key if published else None)
+    metrics.inc("analysis_runs_total", outcome="computed")
+    logging.info(f"Analysis pipeline for '{csv_file}' finished in {time.time() - start_time:.2f}s")
+    return "Analysis completed and results uploaded to S3."
+
+def _input_fingerprint(csv_file):
+    """Identifies one version of an input file, so concurrent requests for it share a single job."""
+    path = os.path.abspath(csv_file)
     try:
-        response = s3.list_objects_v2(Bucket=S3_BUCKET_NAME)  # List objects in the S3 bucket
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                print(f"Object found in S3: {obj['Key']}")
-        else:
-            print("Bucket is empty.")
+        stat = os.stat(path)
+        return (path, stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        return (path, None, None)
+
+def _job_summary(job):
+    return {key: job[key] for key in ("job_id", "status", "input", "submitted_at", "started_at", "finished_at", "result", "error")}
+
+def submit_analysis_job(csv_file=EC2_DATA_FILE):
+    """Queues the analysis pipeline for ``csv_file`` and returns ``(job, created)``.
+
+    While a job for the same input version is queued or running, that job is returned instead of
+    starting another one.
+    """
+    fingerprint = _input_fingerprint(csv_file)
+    with _jobs_lock:
+        active_id = _active_jobs.get(fingerprint)
+        if active_id is not None:
+            return _jobs[active_id], False
+        job_id = uuid.uuid4().hex
+        job = {"job_id": job_id, "status": "queued", "input": csv_file, "submitted_at": time.time(),
+               "started_at": None, "finished_at": None, "result": None, "error": None}
+        _jobs[job_id] = job
+        _active_jobs[fingerprint] = job_id
+        while len(_jobs) > MAX_TRACKED_JOBS:  # Forget the oldest finished jobs
+            oldest_id = next(iter(_jobs))
+            if _jobs[oldest_id]["status"] in ("queued", "running"):
+                break
+            del _jobs[oldest_id]
+    _job_executor.submit(_run_analysis_job, job, fingerprint)
+    return job, True
+
+def _run_analysis_job(job, fingerprint):
+    with _jobs_lock:
+        job["status"], job["started_at"] = "running", time.time()
+    try:
+        with profiled(PROFILE_PIPELINE, PROFILE_OUTPUT_DIR, "analysis"):
+            with metrics.timer("analysis_job_duration_seconds"):
+                result, error, status = run_analysis_pipeline(job["input"]), None, "succeeded"
     except Exception as e:
-        print(f"Error testing S3 connectivity: {e}")
+        logging.error(f"Analysis job {job['job_id']} failed: {e}")
+        metrics.inc("analysis_runs_total", outcome="failed")
+        result, error, status = None, str(e), "failed"
+    with _jobs_lock:
+        job.update(status=status, result=result, error=error, finished_at=time.time())
+        _active_jobs.pop(fingerprint, None)
+
+# --- S3 Bucket Check ---
+def ensure_s3_bucket():
+    """Checks once per process, with a single HeadBucket call, that the bucket exists; creates it if missing."""
+    global _bucket_ready
+    if _bucket_ready:
+        return True
+    with _bucket_lock:
+        if not _bucket_ready:
+            try:
+                s3_service().client.head_bucket(Bucket=S3_BUCKET_NAME)
+                _bucket_ready = True
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("404", "NoSuchBucket"):
+                    _bucket_ready = create_s3_bucket(S3_BUCKET_NAME, S3_REGION)
+                else:
+                    logging.error(f"Cannot access S3 bucket '{S3_BUCKET_NAME}': {e}")
+    return _bucket_ready
+
+# --- App Factory ---
+def create_app(config=None):
+    """Builds the Flask app; WSGI servers call this once per worker process.
+
+    Run with a multi-worker server, e.g. ``gunicorn -w 4 --threads 8 'EC2_Costs:create_app()'``.
+    Flask settings come from ``EC2_COSTS_*`` environment variables and then ``config``. The S3 client
+    is created here, after the worker has forked, and the bucket is checked lazily by the first
+    analysis run instead of listing it at startup.
+    """
+    app = Flask(__name__)
+    app.config.from_prefixed_env("EC2_COSTS")
+    if config:
+        app.config.update(config)
+    app.register_blueprint(routes)
+    s3_service()  # Connection pool for this worker, ready before the first request
+    return app
 
 if __name__ == "__main__":
-    if create_s3_bucket(S3_BUCKET_NAME, S3_REGION):  # Create S3 bucket if it doesn't exist
-        test_s3_connectivity()  # Test S3 connectivity
-        app.run(debug=True)  # Run the Flask app
-    else:
-        print("S3 bucket creation failed. Application will not run.")
\ No newline at end of file
+    create_app().run(threaded=True)  # Development server; use create_app() under a WSGI server in production
@@ -0,0 +1,140 @@
+import bisect  # Import bisect for histogram bucket lookup
+import cProfile  # Import cProfile for optional profile capture
+import logging  # Import logging for logging messages
+import os  # Import os for profile output paths
+import threading  # Import threading for the registry lock
+import time  # Import time for timers
+from contextlib import contextmanager  # Import contextmanager for timer/profile helpers
+
+# Dependency-free counters and histograms rendered in the Prometheus text exposition format
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # Seconds
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape_label_value(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by metric name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}  # name -> (type, help text)
+        self._counters = {}  # name -> {label key: value}
+        self._histograms = {}  # name -> (buckets, {label key: [bucket counts..., sum, count]})
+
+    def counter(self, name, help_text):
+        with self._lock:
+            self._help[name] = ("counter", help_text)
+            self._counters.setdefault(name, {})
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        with self._lock:
+            self._help[name] = ("histogram", help_text)
+            self._histograms.setdefault(name, (tuple(buckets), {}))
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            buckets, series = self._histograms.setdefault(name, (LATENCY_BUCKETS, {}))
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * (len(buckets) + 2)
+            state[bisect.bisect_left(buckets, value)] += 1  # Non-cumulative; summed up when rendering
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observes the wall-clock duration of the ``with`` block in histogram ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric_type, help_text = self._help.get(name, ("counter", name))
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+                lines += [f"{name}{_format_labels(key)} {value}" for key, value in sorted(series.items())]
+            for name, (buckets, series) in sorted(self._histograms.items()):
+                metric_type, help_text = self._help.get(name, ("histogram", name))
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+                for key, state in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(buckets, state):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', repr(float(bound)))])} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {state[-1]}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {state[-2]}")
+                    lines.append(f"{name}_count{_format_labels(key)} {state[-1]}")
+        return "\n".join(lines) + "\n"
+
+def instrument_s3_client(client, registry):
+    """Counts S3 API calls and request/response body bytes for ``client`` in ``registry``.
+
+    Uses botocore's event hooks, so every call made through the client (including managed
+    multipart transfers) is counted. Registering twice on the same client is a no-op.
+    """
+    registry.counter("s3_requests_total", "S3 API calls by operation and outcome.")
+    registry.counter("s3_sent_bytes_total", "Request body bytes sent to S3 by operation.")
+    registry.counter("s3_received_bytes_total", "Response body bytes received from S3 by operation.")
+
+    def _before_send(request, event_name, **kwargs):
+        headers = request.headers  # Chunked (checksum-trailer) uploads carry the size in a separate header
+        sent = int(headers.get("X-Amz-Decoded-Content-Length") or headers.get("Content-Length") or 0)
+        if sent:
+            registry.inc("s3_sent_bytes_total", sent, operation=event_name.rsplit(".", 1)[-1])  # before-send.s3.<Op>
+
+    def _after_call(http_response, parsed, model, **kwargs):
+        status = "error" if http_response.status_code >= 400 else "ok"
+        registry.inc("s3_requests_total", operation=model.name, status=status)
+        if model.name != "HeadObject":  # HEAD reports the object size without sending a body
+            received = int(http_response.headers.get("Content-Length") or 0)
+            if received:
+                registry.inc("s3_received_bytes_total", received, operation=model.name)
+
+    # before-send stops at the first handler that returns a response (e.g. a stub), so run first
+    client.meta.events.register_first("before-send.s3", _before_send, unique_id=f"app-metrics-send-{id(registry)}")
+    client.meta.events.register("after-call.s3", _after_call, unique_id=f"app-metrics-call-{id(registry)}")
+
+_profiler_lock = threading.Lock()  # Only one cProfile profiler can be active per process
+
+@contextmanager
+def profiled(enabled, output_dir, label):
+    """Runs the ``with`` block under cProfile when ``enabled`` and writes ``<output_dir>/<label>-<ts>.prof``.
+
+    If another block is already being profiled, this one runs unprofiled.
+    """
+    if not enabled or not _profiler_lock.acquire(blocking=False):
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _profiler_lock.release()
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{threading.get_ident()}.prof")
+        profiler.dump_stats(path)
+        logging.info(f"Wrote profile {path} (inspect with: python -m pstats {path})")
@@ -1,4 +1,3 @@
-import os
 from io import BytesIO
 import pandas as pd
 import seaborn as sns
@@ -28,7 +27,8 @@ def generate_finops_report():
 
     # Save the plot to a BytesIO stream
     img_stream = BytesIO()
-    plt.savefig(img_stream, format='PNG')
+    fig.savefig(img_stream, format='PNG')
+    plt.close(fig)
     img_stream.seek(0)
 
     # Create the PDF for the report
@@ -40,16 +40,8 @@ def generate_finops_report():
     pdf.cell(200, 10, txt="FinOps Cost Optimization Report", ln=True, align='C')
     pdf.ln(10)  # Add a line break
 
-    # Save the image temporarily to a file
-    temp_img_path = "temp_image.png"
-    with open(temp_img_path, "wb") as f:
-        f.write(img_stream.read())
-
-    # Add the image to the PDF
-    pdf.image(temp_img_path, x=10, y=pdf.get_y(), w=180)
-    
-    # Clean up the temporary image file
-    os.remove(temp_img_path)
+    # Add the image to the PDF straight from memory (fpdf2 accepts file-like objects)
+    pdf.image(img_stream, x=10, y=pdf.get_y(), w=180)
 
     # Add some more details (this can be extended)
     pdf.ln(10)
@@ -1,217 +1,364 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from collections import namedtuple, deque
+from concurrent.futures import ProcessPoolExecutor
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
-import tempfile
+from reportlab.lib.utils import ImageReader
+from reportlab.graphics import renderPDF
+from reportlab.pdfbase import pdfmetrics
+from io import BytesIO
 import os
-import random
+import math
+from functools import partial, lru_cache
+
+try:
+    from svglib.svglib import svg2rlg  # Optional: embeds SVG charts in the PDF as vector graphics
+except ImportError:
+    svg2rlg = None
 
 # --- Data Generation Function ---
-def generate_dynamic_aws_data(num_days=30):
-    """Generates synthetic AWS cost and usage data for the last `num_days` days."""
-    dates = pd.date_range(end=pd.Timestamp.today(), periods=num_days)
-    services = ['EC2', 'S3', 'RDS', 'Lambda']
-    regions = ['us-east-1', 'us-west-2', 'eu-central-1']
-    
-    data = []
-    for date in dates:
-        for service in services:
-            for region in regions:
-                # Base simulated cost and usage
-                base_cost = random.uniform(100, 500)
-                base_usage = random.randint(1000, 10000)
-
-                # Add variation to simulate realistic fluctuation
-                cost = base_cost + random.uniform(-base_cost * 0.3, base_cost * 0.3)
-                usage = base_usage + random.randint(-base_usage // 4, base_usage // 4)
-
-                # Simulate rare anomalies or spikes
-                if random.random() < 0.05:
-                    cost *= random.uniform(2, 4)
-                    usage *= random.randint(3, 6)
-                if random.random() < 0.02:
-                    cost *= random.uniform(0.1, 0.5)
-                    usage = usage // random.randint(2, 5)
-
-                # Append the record
-                data.append({
-                    'Date': date,
-                    'Service': service,
-                    'Region': region,
-                    'ResourceGroup': f'rg-{service}-{region}',
-                    'Cost': cost,
-                    'Currency': 'USD',
-                    'Usage': usage,
-                    'Unit': 'Various'
-                })
-
-    return pd.DataFrame(data)  # Return as a pandas DataFrame
+AWS_SERVICES = ['EC2', 'S3', 'RDS', 'Lambda']
+AWS_REGIONS = ['us-east-1', 'us-west-2', 'eu-central-1']
+SPIKE_RATE = 0.05  # Share of rows with an injected cost/usage spike
+DIP_RATE = 0.02  # Share of rows with an injected cost/usage dip
+
+
+def generate_dynamic_aws_data(num_days=30, seed=None, services=AWS_SERVICES, regions=AWS_REGIONS,
+                              spike_rate=SPIKE_RATE, dip_rate=DIP_RATE, end_date=None):
+    """Generates synthetic AWS cost and usage data for the last `num_days` days.
+
+    One row per (date, service, region), drawn with NumPy in a single vectorized pass, so multi-year
+    horizons and large catalogs produce millions of rows in seconds. The same `seed` gives the same
+    data. Each row is a spike (`spike_rate`), a dip (`dip_rate`) or normal, and the ground truth is
+    kept in the `Anomaly` column ('spike', 'dip' or 'none').
+    """
+    if spike_rate < 0 or dip_rate < 0 or spike_rate + dip_rate > 1:
+        raise ValueError("spike_rate and dip_rate must be non-negative and sum to at most 1")
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=end_date or pd.Timestamp.today(), periods=num_days)
+    services, regions = list(services), list(regions)
+    pairs = len(services) * len(regions)
+    rows = num_days * pairs
+
+    # Base simulated cost and usage, plus variation to simulate realistic fluctuation
+    base_cost = rng.uniform(100, 500, rows)
+    base_usage = rng.integers(1000, 10000, rows, endpoint=True)
+    cost = base_cost + rng.uniform(-0.3, 0.3, rows) * base_cost
+    usage = base_usage + rng.integers(-base_usage // 4, base_usage // 4, endpoint=True)
+
+    # Inject anomalies: one uniform draw per row decides spike, dip or normal
+    draw = rng.random(rows)
+    spike = draw < spike_rate
+    dip = (draw >= spike_rate) & (draw < spike_rate + dip_rate)
+    cost[spike] *= rng.uniform(2, 4, spike.sum())
+    usage[spike] *= rng.integers(3, 6, spike.sum(), endpoint=True)
+    cost[dip] *= rng.uniform(0.1, 0.5, dip.sum())
+    usage[dip] //= rng.integers(2, 5, dip.sum(), endpoint=True)
+
+    # Rows are date-major, then service, then region; labels are categoricals built from codes
+    pair_codes = np.tile(np.arange(pairs), num_days)
+    resource_groups = [f'rg-{service}-{region}' for service in services for region in regions]
+    anomaly = np.zeros(rows, dtype=np.int8)
+    anomaly[spike], anomaly[dip] = 1, 2
+
+    return pd.DataFrame({
+        'Date': np.repeat(dates.values, pairs),
+        'Service': pd.Categorical.from_codes(pair_codes // len(regions), services),
+        'Region': pd.Categorical.from_codes(pair_codes % len(regions), regions),
+        'ResourceGroup': pd.Categorical.from_codes(pair_codes, resource_groups),
+        'Cost': cost,
+        'Currency': 'USD',
+        'Usage': usage,
+        'Unit': 'Various',
+        'Anomaly': pd.Categorical.from_codes(anomaly, ['none', 'spike', 'dip']),
+    })
+
+
+# --- Chart Rendering Engine ---
+FACET_COLUMNS = 3  # Small-multiples grid: panels per row
+FACET_ROWS = 4  # Rows per faceted figure, so up to 12 services/regions share one figure
+FACET_LAYOUT_THRESHOLD = 8  # layout='auto' facets a dimension with more keys than this
+
+# One line chart: `caption` is the title drawn above it in the PDF, the rest describes the plot
+ChartSpec = namedtuple('ChartSpec', ['caption', 'title', 'dates', 'values', 'ylabel', 'marker', 'color', 'label'])
+# One small-multiples figure: `panels` is a list of (label, dates, values) sharing both axes
+FacetSpec = namedtuple('FacetSpec', ['caption', 'title', 'panels', 'ylabel', 'color'])
+
+
+def _figure_bytes(fig, image_format):
+    buffer = BytesIO()
+    fig.savefig(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def render_chart(spec, image_format='png'):
+    """Renders one ChartSpec with the Figure/Agg API (no pyplot state, safe in workers)."""
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(spec.dates, spec.values, marker=spec.marker, label=spec.label, color=spec.color)
+    ax.set_title(spec.title)
+    ax.set_xlabel('Date')
+    ax.set_ylabel(spec.ylabel)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    for tick_label in ax.get_xticklabels():
+        tick_label.set_rotation(45)
+        tick_label.set_horizontalalignment('right')
+    ax.grid(True)
+    fig.tight_layout()
+    return _figure_bytes(fig, image_format)
+
+
+def render_facets(spec, image_format='png'):
+    """Renders a FacetSpec as one subplot grid with shared x and y axes."""
+    rows = math.ceil(len(spec.panels) / FACET_COLUMNS)
+    fig = Figure(figsize=(10, 2.5 * rows + 1))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(rows, FACET_COLUMNS, sharex=True, sharey=True, squeeze=False).flat
+    for i, (ax, (label, dates, values)) in enumerate(zip(axes, spec.panels)):
+        ax.plot(dates, values, color=spec.color, linewidth=1)
+        ax.set_title(label, fontsize=9)
+        ax.grid(True)
+        ax.tick_params(labelsize=7, labelbottom=i + FACET_COLUMNS >= len(spec.panels))  # Bottom panel of each column
+    for ax in axes[len(spec.panels):]:
+        ax.set_visible(False)
+    locator = mdates.AutoDateLocator(maxticks=4)
+    axes[0].xaxis.set_major_locator(locator)  # Shared: applies to every panel
+    axes[0].xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    fig.suptitle(spec.title)
+    fig.supylabel(spec.ylabel)
+    fig.subplots_adjust(left=0.09, right=0.98, bottom=0.5 / fig.get_figheight(), top=1 - 0.6 / fig.get_figheight(),
+                        wspace=0.08, hspace=0.35)  # Fixed margins: tight_layout costs as much as drawing the grid
+    return _figure_bytes(fig, image_format)
+
+
+def render_spec(spec, image_format='png'):
+    if isinstance(spec, FacetSpec):
+        return render_facets(spec, image_format)
+    return render_chart(spec, image_format)
+
+
+def iter_rendered_charts(specs, max_workers=None, image_format='png'):
+    """Yields rendered ChartSpecs/FacetSpecs in input order, rendering ahead in worker processes.
+
+    At most two charts per worker are in flight, so memory stays bounded however many charts there
+    are. `image_format` is 'png' or 'svg'. `max_workers=None` uses every core;
+    1 (or a single chart) renders in this process.
+    """
+    specs = list(specs)
+    render = partial(render_spec, image_format=image_format)
+    if max_workers == 1 or len(specs) < 2:
+        for spec in specs:
+            yield render(spec)
+        return
+    workers = max_workers or os.cpu_count() or 1
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for spec in specs:
+            pending.append(pool.submit(render, spec))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def render_charts(specs, max_workers=None, image_format='png'):
+    """Renders ChartSpecs/FacetSpecs in parallel worker processes and returns their bytes in input order."""
+    return list(iter_rendered_charts(specs, max_workers, image_format))
+
+
+def report_chart_specs(service_series, region_series, layout='auto'):
+    """Chart specs for the report: cost and usage per service, then per region.
+
+    `layout` is 'single' (one figure per key and metric), 'faceted' (small multiples, FACET_ROWS x
+    FACET_COLUMNS keys per figure) or 'auto' (faceted only for dimensions above FACET_LAYOUT_THRESHOLD keys).
+    """
+    specs = []
+    for dimension, key_series, cost_style, usage_style in (
+            ('Service', service_series, ('o', 'blue'), ('s', 'green')),
+            ('Region', region_series, ('^', 'red'), ('v', 'orange'))):
+        faceted = layout == 'faceted' or (layout == 'auto' and len(key_series) > FACET_LAYOUT_THRESHOLD)
+        if not faceted:
+            for name, data in key_series.items():
+                dates = data.index.to_numpy()
+                specs.append(ChartSpec(f'{name} Daily Cost', f'{name} Daily Cost (USD)', dates,
+                                       data['Cost'].to_numpy(), 'Cost (USD)', *cost_style, name))
+                specs.append(ChartSpec(f'{name} Daily Usage', f'{name} Daily Usage', dates,
+                                       data['Usage'].to_numpy(), 'Usage (Units)', *usage_style, name))
+            continue
+        items = list(key_series.items())
+        per_figure = FACET_COLUMNS * FACET_ROWS
+        figures = math.ceil(len(items) / per_figure)
+        for n, start in enumerate(range(0, len(items), per_figure), 1):
+            chunk = items[start:start + per_figure]
+            part = f' ({n}/{figures})' if figures > 1 else ''
+            for metric, ylabel, (_, color) in (('Cost', 'Cost (USD)', cost_style), ('Usage', 'Usage (Units)', usage_style)):
+                panels = [(str(name), data.index.to_numpy(), data[metric].to_numpy()) for name, data in chunk]
+                specs.append(FacetSpec(f'Daily {metric} by {dimension}{part}', f'Daily {metric} by {dimension}{part}',
+                                       panels, ylabel, color))
+    return specs
+
+
+def draw_chart(c, chart, image_format, x, y, width, height):
+    """Draws rendered chart bytes on the canvas: PNG as an image, SVG as vector graphics."""
+    if image_format == 'svg':
+        drawing = svg2rlg(BytesIO(chart))
+        drawing.scale(width / drawing.width, height / drawing.height)
+        renderPDF.draw(drawing, c, x, y)
+    else:
+        c.drawImage(ImageReader(BytesIO(chart)), x, y, width=width, height=height)
+
+
+# --- PDF Page Writer ---
+@lru_cache(maxsize=8192)
+def _text_width(text, font_name, font_size):
+    return pdfmetrics.stringWidth(text, font_name, font_size)
+
+
+def wrap_text(text, font_name, font_size, max_width):
+    """Greedy word wrap measured with font metrics instead of character counts.
+
+    Widths come from a cache keyed by (word, font, size), so each distinct word is measured once.
+    """
+    space = _text_width(' ', font_name, font_size)
+    lines = []
+    for paragraph in text.split('\n'):
+        line, line_width = [], 0.0
+        for word in paragraph.split():
+            width = _text_width(word, font_name, font_size)
+            if line and line_width + space + width > max_width:
+                lines.append(' '.join(line))
+                line, line_width = [word], width
+            else:
+                line_width += (space if line else 0) + width
+                line.append(word)
+        lines.append(' '.join(line))
+    return lines
+
+
+class ReportPageWriter:
+    """Lays the report out top to bottom and finishes each page as soon as it is full.
+
+    Page streams are compressed when the page ends, and chart bytes are dropped right after they
+    are drawn, so only the current page is held in drawing form.
+    """
+
+    def __init__(self, output_pdf, pagesize=letter, margin=50):
+        self.canvas = canvas.Canvas(output_pdf, pagesize=pagesize, pageCompression=1)
+        self.page_width, self.page_height = pagesize
+        self.left = margin
+        self.right = self.page_width - margin
+        self.top = self.page_height - margin
+        self.bottom = margin
+        self.y = self.top  # Top of the free space on the current page
+        self.pages = 1
+
+    def new_page(self):
+        self.canvas.showPage()
+        self.pages += 1
+        self.y = self.top
+
+    def ensure_space(self, height):
+        """Starts a new page unless `height` points still fit (a block taller than a page gets its own)."""
+        if self.y - height < self.bottom and self.y < self.top:
+            self.new_page()
+
+    def centered_text(self, text, font_name, font_size, y):
+        self.canvas.setFont(font_name, font_size)
+        self.canvas.drawCentredString(self.page_width / 2, y, text)
+
+    def heading(self, text, font_name="Helvetica-Bold", font_size=24, space_after=26):
+        self.ensure_space(font_size + space_after)
+        self.canvas.setFont(font_name, font_size)
+        self.canvas.drawString(self.left, self.y - font_size, text)
+        self.y -= font_size + space_after
+
+    def paragraph(self, text, font_name="Helvetica", font_size=9, leading=11, space_after=3):
+        for line in wrap_text(text, font_name, font_size, self.right - self.left):
+            self.ensure_space(leading)
+            self.canvas.setFont(font_name, font_size)  # showPage() resets the font
+            self.canvas.drawString(self.left, self.y - font_size, line)
+            self.y -= leading
+        self.y -= space_after
+
+    def chart(self, caption, chart, image_format, height, width=550, caption_height=20, space_after=30):
+        """Draws a caption and a rendered chart (PNG bytes, or SVG bytes drawn as vectors)."""
+        self.ensure_space(caption_height + height)
+        self.canvas.setFont("Helvetica", 12)
+        self.canvas.drawString(self.left, self.y - 12, caption)
+        self.y -= caption_height + height
+        draw_chart(self.canvas, chart, image_format, self.left, self.y, width, height)
+        self.y -= space_after
+
+    def save(self):
+        self.canvas.save()
 
 
 # --- Report Generation Function ---
-def generate_aws_finops_report(csv_file_path, output_pdf="aws_finops_report.pdf"):
-    temp_files = []  # Track temp chart images for cleanup
+def daily_series_by(df, key):
+    """Daily Cost/Usage totals per value of `key`, as {value: frame indexed by Date}.
+
+    The frame is partitioned once by a single groupby that also does the daily resampling, so the
+    cost no longer grows with (number of values x rows). Values keep their first-appearance order.
+    """
+    daily = df.groupby([key, pd.Grouper(key='Date', freq='D')], observed=True)[['Cost', 'Usage']].sum()
+    partitions = {value: frame.droplevel(0) for value, frame in daily.groupby(level=0, observed=True)}
+    return {value: partitions[value] for value in df[key].unique() if value in partitions}
+
+
+def generate_aws_finops_report(csv_file_path, output_pdf="aws_finops_report.pdf", layout='auto', image_format='png'):
+    """Builds the PDF report. `layout` is 'auto', 'single' or 'faceted' (see report_chart_specs);
+    `image_format='svg'` embeds charts as vector graphics (requires svglib)."""
+    if image_format not in ('png', 'svg'):
+        raise ValueError(f"image_format must be 'png' or 'svg', not {image_format!r}")
+    if image_format == 'svg' and svg2rlg is None:
+        print("svglib is not installed; embedding charts as PNG instead of SVG.")
+        image_format = 'png'
     try:
         # Load the CSV data
-        df = pd.read_csv(csv_file_path)
+        df = pd.read_csv(csv_file_path, dtype={'Service': 'category', 'Region': 'category'})
         df['Date'] = pd.to_datetime(df['Date'])  # Convert 'Date' to datetime
 
-        # --- Layout Settings ---
-        left_margin = 50
-        right_margin = letter[0] - 50
-        top_margin = letter[1] - 50
-        bottom_margin = 50
-
-        # Get unique services and regions for grouping
-        services = df['Service'].unique()
-        regions = df['Region'].unique()
-
-        chart_titles = []  # Keep titles for each chart for later use
-
-        # --- Charts by Service ---
-        for service in services:
-            service_data = df[df['Service'] == service]
-
-            # Cost over time chart
-            plt.figure(figsize=(10, 5))
-            plt.plot(service_data['Date'], service_data['Cost'], marker='o', label=service, color='blue')
-            plt.title(f'{service} Daily Cost (USD)')
-            plt.xlabel('Date')
-            plt.ylabel('Cost (USD)')
-            plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-            plt.xticks(rotation=45, ha='right')
-            plt.grid(True)
-            plt.tight_layout()
-            cost_temp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-            plt.savefig(cost_temp.name)
-            plt.close()
-            temp_files.append(cost_temp)
-            chart_titles.append(f'{service} Daily Cost')
-
-            # Usage over time chart
-            plt.figure(figsize=(10, 5))
-            plt.plot(service_data['Date'], service_data['Usage'], marker='s', label=service, color='green')
-            plt.title(f'{service} Daily Usage')
-            plt.xlabel('Date')
-            plt.ylabel('Usage (Units)')
-            plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-            plt.xticks(rotation=45, ha='right')
-            plt.grid(True)
-            plt.tight_layout()
-            usage_temp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-            plt.savefig(usage_temp.name)
-            plt.close()
-            temp_files.append(usage_temp)
-            chart_titles.append(f'{service} Daily Usage')
-
-        # --- Charts by Region ---
-        for region in regions:
-            region_data = df[df['Region'] == region]
-
-            # Region cost
-            plt.figure(figsize=(10, 5))
-            plt.plot(region_data['Date'], region_data['Cost'], marker='^', label=region, color='red')
-            plt.title(f'{region} Daily Cost (USD)')
-            plt.xlabel('Date')
-            plt.ylabel('Cost (USD)')
-            plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-            plt.xticks(rotation=45, ha='right')
-            plt.grid(True)
-            plt.tight_layout()
-            cost_temp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-            plt.savefig(cost_temp.name)
-            plt.close()
-            temp_files.append(cost_temp)
-            chart_titles.append(f'{region} Daily Cost')
-
-            # Region usage
-            plt.figure(figsize=(10, 5))
-            plt.plot(region_data['Date'], region_data['Usage'], marker='v', label=region, color='orange')
-            plt.title(f'{region} Daily Usage')
-            plt.xlabel('Date')
-            plt.ylabel('Usage (Units)')
-            plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-            plt.xticks(rotation=45, ha='right')
-            plt.grid(True)
-            plt.tight_layout()
-            usage_temp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-            plt.savefig(usage_temp.name)
-            plt.close()
-            temp_files.append(usage_temp)
-            chart_titles.append(f'{region} Daily Usage')
-
-        # --- Start Building PDF ---
-        c = canvas.Canvas(output_pdf, pagesize=letter)
+        # Partition once into daily series per service and per region
+        service_series = daily_series_by(df, 'Service')
+        region_series = daily_series_by(df, 'Region')
+
+        # --- Chart Specs: cost and usage per service, then per region ---
+        chart_specs = report_chart_specs(service_series, region_series, layout)
+        writer = ReportPageWriter(output_pdf)
 
         # --- Title Page ---
-        c.setFont("Helvetica-Bold", 36)
-        c.drawCentredString(letter[0] / 2, top_margin - 50, "AWS FinOps Report")
-        c.setFont("Helvetica", 20)
-        c.drawCentredString(letter[0] / 2, top_margin - 100, "By Alex Curtis")
-        c.showPage()  # Move to next page
+        writer.centered_text("AWS FinOps Report", "Helvetica-Bold", 36, writer.top - 50)
+        writer.centered_text("By Alex Curtis", "Helvetica", 20, writer.top - 100)
+        writer.new_page()
 
         # --- Summary Page ---
-        c.setFont("Helvetica-Bold", 24)
-        c.drawString(left_margin, top_margin - 50, "Report Summary")
-
+        writer.heading("Report Summary")
         summary_text = """# Summary text placeholder - Replace with insights, high-level cost breakdowns, and findings."""
-        c.setFont("Helvetica", 9)
-        lines = summary_text.split('\n')
-        y_position = top_margin - 100
-
-        for line in lines:
-            # Wrap long lines manually
-            if len(line) > 90:
-                words = line.split()
-                wrapped_line = ""
-                current_length = 0
-                for word in words:
-                    if current_length + len(word) + 1 <= 90:
-                        wrapped_line += word + " "
-                        current_length += len(word) + 1
-                    else:
-                        c.drawString(left_margin, y_position, wrapped_line.strip())
-                        y_position -= 11
-                        wrapped_line = word + " "
-                        current_length = len(word) + 1
-                c.drawString(left_margin, y_position, wrapped_line.strip())
-            else:
-                c.drawString(left_margin, y_position, line.strip())
-            y_position -= 14
-
-        c.showPage()  # Move to chart pages
+        writer.paragraph(summary_text)
+        writer.new_page()  # Move to chart pages
 
-        # --- Charts with Titles ---
-        y_pos = top_margin - 50
-        chart_height = 200
-        chart_width = 550
-        y_text_offset = 20
-
-        for i, temp_file in enumerate(temp_files):
-            c.setFont("Helvetica", 12)
-            c.drawString(left_margin, y_pos + chart_height + y_text_offset, chart_titles[i])
-            c.drawImage(temp_file.name, left_margin, y_pos, width=chart_width, height=chart_height)
-            y_pos -= (chart_height + 50)
-
-            # New page if running low on space
-            if y_pos < bottom_margin:
-                c.showPage()
-                y_pos = top_margin - 50
+        # --- Charts with Titles: rendered ahead in workers, drawn and released one at a time ---
+        charts = iter_rendered_charts(chart_specs, image_format=image_format)
+        for spec, chart_image in zip(chart_specs, charts):
+            if isinstance(spec, FacetSpec):  # Keep the grid's aspect ratio, at most one page tall
+                rows = math.ceil(len(spec.panels) / FACET_COLUMNS)
+                chart_height = min(550 * (2.5 * rows + 1) / 10, writer.top - writer.bottom - 20)
+            else:
+                chart_height = 200
+            writer.chart(spec.caption, chart_image, image_format, chart_height)
 
-        c.save()  # Finalize PDF
+        writer.save()  # Finalize PDF
         print(f"AWS FinOps report generated: {output_pdf}")
 
     except FileNotFoundError:
         print(f"Error: CSV file not found at {csv_file_path}")
     except Exception as e:
         print(f"Error generating report: {e}")
-    finally:
-        # Clean up temporary files
-        for tf in temp_files:
-            if tf is not None and hasattr(tf, 'name') and os.path.exists(tf.name):
-                tf.close()
-                os.unlink(tf.name)
 
 
 # --- Main Script ---
@@ -0,0 +1,161 @@
+import math  # Import math for rounding runtime days
+import logging  # Import logging for logging messages
+from datetime import datetime, timedelta, timezone  # Import datetime for the CPU lookback window
+from concurrent.futures import ThreadPoolExecutor  # Import ThreadPoolExecutor for parallel collection
+
+import boto3  # Import boto3 for AWS EC2/CloudWatch interaction
+import numpy as np  # Import numpy for missing-value markers
+import pandas as pd  # Import pandas for the inventory frame
+from botocore.config import Config  # Import Config for connection pool and retry settings
+
+# Builds the ec2_data.csv inventory that EC2_Costs.analyze_ec2_costs expects, straight from the
+# EC2 and CloudWatch APIs, across several accounts and regions at once.
+
+DEFAULT_REGIONS = ["us-east-1", "us-east-2", "us-west-2", "eu-central-1"]  # Regions scanned by default
+CPU_LOOKBACK_DAYS = 14  # Window for the average CPU utilization
+METRICS_PER_REQUEST = 500  # GetMetricData accepts up to 500 queries per call
+COLLECTOR_WORKERS = 16  # Concurrent (account, region) scans
+HOURS_PER_MONTH = 730  # Hours used to turn hourly prices into monthly cost
+LOW_CPU_THRESHOLD = 20  # Below this average CPU an instance is a downsizing candidate
+HIGH_CPU_THRESHOLD = 80  # Above this average CPU an instance should be upsized
+DOWNSIZE_SAVINGS_RATIO = 0.5  # One size down roughly halves the on-demand price
+
+# Approximate on-demand Linux prices (USD/hour); unknown types get an empty cost
+HOURLY_PRICES = {
+    "t3.nano": 0.0052, "t3.micro": 0.0104, "t3.small": 0.0208, "t3.medium": 0.0416,
+    "t3.large": 0.0832, "t3.xlarge": 0.1664, "t3.2xlarge": 0.3328,
+    "m5.large": 0.096, "m5.xlarge": 0.192, "m5.2xlarge": 0.384, "m5.4xlarge": 0.768,
+    "c5.large": 0.085, "c5.xlarge": 0.17, "c5.2xlarge": 0.34, "c5.4xlarge": 0.68,
+    "r5.large": 0.126, "r5.xlarge": 0.252, "r5.2xlarge": 0.504, "r5.4xlarge": 1.008,
+}
+
+INVENTORY_COLUMNS = ["Account ID", "Instance ID", "Instance Type", "Region", "State", "Monthly Cost ($)",
+                     "Avg CPU (%)", "Runtime Days", "Recommendation", "Estimated Savings ($)"]
+
+_CLIENT_CONFIG = Config(max_pool_connections=COLLECTOR_WORKERS, retries={"max_attempts": 8, "mode": "adaptive"})
+
+def _assume_role(role_arn):
+    """Returns temporary credentials for ``role_arn`` via STS AssumeRole (None for the caller's account)."""
+    if role_arn is None:
+        return None
+    credentials = boto3.session.Session().client("sts").assume_role(
+        RoleArn=role_arn, RoleSessionName="ec2-inventory-collector")["Credentials"]
+    return {
+        "aws_access_key_id": credentials["AccessKeyId"],
+        "aws_secret_access_key": credentials["SecretAccessKey"],
+        "aws_session_token": credentials["SessionToken"],
+    }
+
+def _account_session(credentials=None):
+    """Returns a new session for the caller's account, or for credentials from ``_assume_role``."""
+    return boto3.session.Session(**(credentials or {}))
+
+def _describe_instances(ec2):
+    """Yields ``(owner account id, instance)`` for every instance in the client's region, following pagination."""
+    for page in ec2.get_paginator("describe_instances").paginate(PaginationConfig={"PageSize": 1000}):
+        for reservation in page["Reservations"]:
+            for instance in reservation["Instances"]:
+                yield reservation.get("OwnerId"), instance
+
+def average_cpu_utilization(cloudwatch, instance_ids, start, end):
+    """Returns ``{instance_id: average CPUUtilization}`` using batched GetMetricData calls.
+
+    Each call carries up to ``METRICS_PER_REQUEST`` instances and asks for a single datapoint
+    spanning the whole window, so the call count grows with fleet size / 500.
+    """
+    period = max(60, int((end - start).total_seconds()) // 60 * 60)  # One datapoint for the whole window
+    averages = {}
+    for offset in range(0, len(instance_ids), METRICS_PER_REQUEST):
+        batch = instance_ids[offset:offset + METRICS_PER_REQUEST]
+        queries = [{
+            "Id": f"cpu{i}",
+            "MetricStat": {
+                "Metric": {"Namespace": "AWS/EC2", "MetricName": "CPUUtilization",
+                           "Dimensions": [{"Name": "InstanceId", "Value": instance_id}]},
+                "Period": period,
+                "Stat": "Average",
+            },
+            "ReturnData": True,
+        } for i, instance_id in enumerate(batch)]
+        sums, counts = {}, {}
+        for page in cloudwatch.get_paginator("get_metric_data").paginate(
+                MetricDataQueries=queries, StartTime=start, EndTime=end):
+            for result in page["MetricDataResults"]:
+                instance_id = batch[int(result["Id"][3:])]
+                sums[instance_id] = sums.get(instance_id, 0.0) + sum(result["Values"])
+                counts[instance_id] = counts.get(instance_id, 0) + len(result["Values"])
+        averages.update({instance_id: sums[instance_id] / counts[instance_id]
+                         for instance_id in sums if counts[instance_id]})
+    return averages
+
+def _recommend(state, avg_cpu, monthly_cost):
+    """Returns ``(recommendation, estimated monthly savings)`` for one instance."""
+    if state != "running":
+        return "Terminate", 0.0  # Stopped: compute is not billed, flag it for cleanup
+    if avg_cpu < LOW_CPU_THRESHOLD:  # NaN (no datapoints) compares False and falls through to "Keep"
+        return "Downsize", np.nan_to_num(monthly_cost) * DOWNSIZE_SAVINGS_RATIO
+    if avg_cpu > HIGH_CPU_THRESHOLD:
+        return "Upsize", 0.0
+    return "Keep", 0.0
+
+def _collect_region(role_arn, credentials, region, lookback_days, endpoint_url):
+    """Scans one (account, region) pair and returns its inventory rows."""
+    session = _account_session(credentials)  # One session per task: sessions are not thread-safe
+    ec2 = session.client("ec2", region_name=region, endpoint_url=endpoint_url, config=_CLIENT_CONFIG)
+    cloudwatch = session.client("cloudwatch", region_name=region, endpoint_url=endpoint_url, config=_CLIENT_CONFIG)
+
+    instances = [(owner_id, i) for owner_id, i in _describe_instances(ec2) if i["State"]["Name"] != "terminated"]
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=lookback_days)
+    running_ids = [i["InstanceId"] for _, i in instances if i["State"]["Name"] == "running"]
+    cpu = average_cpu_utilization(cloudwatch, running_ids, start, end) if running_ids else {}
+
+    rows = []
+    for owner_id, instance in instances:
+        instance_type, state = instance["InstanceType"], instance["State"]["Name"]
+        hourly = HOURLY_PRICES.get(instance_type)
+        monthly_cost = round(hourly * HOURS_PER_MONTH, 2) if hourly is not None else np.nan
+        runtime_days = math.ceil((end - instance["LaunchTime"]).total_seconds() / 86400) if state == "running" else 0
+        avg_cpu = cpu.get(instance["InstanceId"], np.nan)
+        recommendation, savings = _recommend(state, avg_cpu, monthly_cost)
+        rows.append([owner_id, instance["InstanceId"], instance_type, region, state,
+                     monthly_cost, round(avg_cpu, 2), runtime_days,
+                     recommendation, round(savings, 2)])
+    logging.info(f"Collected {len(rows)} instances from {role_arn or 'default account'}/{region}")
+    return rows
+
+def collect_ec2_inventory(regions=None, role_arns=None, lookback_days=CPU_LOOKBACK_DAYS,
+                          max_workers=COLLECTOR_WORKERS, endpoint_url=None):
+    """Collects the fleet inventory for every account and region concurrently.
+
+    ``role_arns`` lists IAM roles to assume, one per account; None scans the caller's own account.
+    ``endpoint_url`` points the EC2/CloudWatch clients at a local stub (e.g. moto server) for testing.
+    Returns a frame with the ``ec2_data.csv`` columns ``analyze_ec2_costs`` reads.
+    """
+    regions = regions or DEFAULT_REGIONS
+    accounts = {}  # role_arn -> credentials: one AssumeRole per account, shared by its regions
+    for role_arn in (role_arns or [None]):
+        try:
+            accounts[role_arn] = _assume_role(role_arn)
+        except Exception as e:
+            logging.error(f"Failed to assume {role_arn}: {e}")
+    tasks = [(role_arn, region) for role_arn in accounts for region in regions]
+    rows = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as pool:
+        futures = {pool.submit(_collect_region, role_arn, accounts[role_arn], region, lookback_days, endpoint_url):
+                   (role_arn, region) for role_arn, region in tasks}
+        for future, (role_arn, region) in futures.items():
+            try:
+                rows.extend(future.result())
+            except Exception as e:
+                logging.error(f"Failed to collect EC2 inventory for {role_arn or 'default account'}/{region}: {e}")
+    inventory = pd.DataFrame(rows, columns=INVENTORY_COLUMNS)
+    numeric = ["Monthly Cost ($)", "Avg CPU (%)", "Estimated Savings ($)"]
+    inventory[numeric] = inventory[numeric].astype(float)  # Float even when every value is missing
+    return inventory
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    inventory = collect_ec2_inventory()
+    inventory.to_csv("ec2_data.csv", index=False)  # Input for EC2_Costs /run_analysis
+    logging.info(f"Wrote ec2_data.csv ({len(inventory)} instances)")
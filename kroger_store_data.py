@@ -1,19 +1,30 @@
+import matplotlib
+matplotlib.use('Agg')  # Force Matplotlib to use the Agg backend for server-side image generation
+
 import pandas as pd  # Import pandas for data manipulation
-import matplotlib.pyplot as plt  # Import matplotlib for plotting
+from matplotlib.figure import Figure  # Import Figure for pyplot-free chart rendering
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # Import the Agg canvas for rendering figures
 import seaborn as sns  # Import seaborn for enhanced visualizations
-import boto3  # Import boto3 for AWS S3 interaction
+from s3_transfer import get_s3_service  # Import the shared S3 transfer service
 import os  # Import os for operating system interactions
 import hashlib  # Import hashlib for password hashing
 import secrets  # Import secrets for generating secure tokens
-from flask import Flask, render_template, request, send_from_directory, Response  # Import Flask for web application
-from datetime import datetime, timedelta  # Import datetime for date/time operations
+from flask import Flask, Blueprint, render_template, request, send_from_directory, send_file, redirect, Response  # Import Flask for web application
 import schedule  # Import schedule for task scheduling
 import time  # Import time for time-related operations
 import logging  # Import logging for logging messages
 import numpy as np  # Import numpy for numerical operations
-import random  # Import random for random number generation
 import matplotlib.ticker as ticker  # Import ticker for formatting axis ticks
 import matplotlib.dates as mdates  # Import mdates for formatting date axis
+from collections import namedtuple  # Import namedtuple for metric specs
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed  # Import executors for parallel charts
+import io  # Import io for in-memory chart buffers
+import gzip  # Import gzip for pre-compressed HTML
+from functools import lru_cache  # Import lru_cache to keep the compiled template
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, Undefined, select_autoescape  # Import Jinja2 for the HTML template
+import json  # Import json for the upload manifest
+import threading  # Import threading for the upload manifest lock
+from botocore.exceptions import ClientError  # Import ClientError for S3 error handling
 
 # Kroger-Specific Configuration
 S3_BUCKET_NAME = "kroger-sales-analysis-web"  # S3 bucket name
@@ -21,119 +32,255 @@ S3_FILE_NAME = "kroger_sales_analysis.csv"  # S3 file name
 S3_VISUALIZATIONS_PREFIX = "kroger_sales_visualizations/"  # S3 prefix for visualizations
 S3_REGION = "us-west-2"  # S3 region
 CSV_FILE_PATH = "generic_store_data.csv"  # Local CSV file path
+PARQUET_FILE_PATH = "generic_store_data.parquet"  # Local columnar (Parquet) file path
+DATA_FILE_PATH = PARQUET_FILE_PATH  # Storage used by the scheduled job (CSV_FILE_PATH to fall back to CSV)
 HTML_FILE_NAME = "index.html"  # HTML file name
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")  # Jinja2 templates
+HTML_TEMPLATE_NAME = "kroger_sales_report.html"  # Report page template
+HTML_CONTENT_ENCODING = "gzip"  # Pre-compression for the report page: "gzip" or "br" (needs brotli)
+ANALYSIS_WINDOW_DAYS = 90  # Days of history covered by the report
+ANALYSIS_STATE_FILE = "kroger_analysis_state.pkl"  # Local running-aggregate state for incremental runs
+INCREMENTAL_ANALYSIS = True  # Fold only new days into the saved state on scheduled runs
+UPLOAD_MANIFEST_FILE = "kroger_upload_manifest.json"  # Local record of the content hash last uploaded per S3 key
 
 PASSWORD_HASH = hashlib.sha256("kroger_web_password".encode()).hexdigest()  # Hash the password
 SALT = secrets.token_hex(16)  # Generate a salt
 PASSWORD_HASH = hashlib.sha256((PASSWORD_HASH + SALT).encode()).hexdigest()  # Hash the password with the salt
 
-app = Flask(__name__)  # Initialize Flask app
+routes = Blueprint("kroger_sales", __name__)  # Report routes, registered by create_app()
 
 # --- Data Generation Function ---
 
-def generate_specific_store_data(num_days=90):
-    cities = ["New York", "Los Angeles", "Chicago", "Houston", "Phoenix",
-              "Philadelphia", "San Antonio", "San Diego", "Dallas", "San Jose"]  # List of cities
-    stores = [f"{city}_Store_{random.randint(1, 5)}" for city in cities for _ in range(2)]  # Generate store names
-    categories = ["Electronics", "Clothing", "Groceries", "Home Goods", "Books", "Fuel"]  # List of product categories
-    departments = ["Sales", "Marketing", "Inventory", "Customer Service"]  # List of departments
-    fuel_types = ["Gasoline", "Diesel"]  # List of fuel types
-
-    data = []  # Initialize data list
-    start_date = datetime.now() - timedelta(days=num_days)  # Calculate start date
-
-    for store in stores:
-        for day in range(num_days):
-            current_date = start_date  # Set current date
-            for category in categories:
-                for department in departments:
-                    if category == "Electronics":
-                        sales_amount = max(0, np.random.normal(loc=1500, scale=400))  # Generate sales amount
-                    elif category == "Clothing":
-                        sales_amount = max(0, np.random.normal(loc=1200, scale=350))  # Generate sales amount
-                    elif category == "Groceries":
-                        sales_amount = max(0, np.random.normal(loc=2000, scale=500))  # Generate sales amount
-                    elif category == "Home Goods":
-                        sales_amount = max(0, np.random.normal(loc=1000, scale=300))  # Generate sales amount
-                    elif category == "Books":
-                        sales_amount = max(0, np.random.normal(loc=800, scale=250))  # Generate sales amount
-                    else:  # Fuel
-                        gasoline_gallons = max(0, np.random.normal(loc=1000, scale=300))  # Generate gallons of gasoline
-                        diesel_gallons = max(0, np.random.normal(loc=500, scale=150))  # Generate gallons of diesel
-                        fuel_type = random.choice(fuel_types)  # Choose fuel type
-
-                        base_gas_price = 3.8  # Base gasoline price
-                        base_diesel_price = 4.2  # Base diesel price
-
-                        week_of_year = current_date.isocalendar()[1]  # Get week of year
-                        price_fluctuation = np.sin(week_of_year / 4) * 0.3  # Calculate price fluctuation
-
-                        if fuel_type == "Gasoline":
-                            if "New York" in store or "Los Angeles" in store:
-                                regional_adjustment = 0.7  # Regional adjustment
-                            elif "San Francisco" in store or "San Jose" in store:
-                                regional_adjustment = 0.5  # Regional adjustment
-                            else:
-                                regional_adjustment = 0  # Regional adjustment
-                        else:  # Diesel
-                            if "New York" in store or "Los Angeles" in store:
-                                regional_adjustment = 0.8  # Regional adjustment
-                            elif "Houston" in store or "Dallas" in store:
-                                regional_adjustment = 0.3  # Regional adjustment
-                            else:
-                                regional_adjustment = 0  # Regional adjustment
-
-                        fuel_price = max(2.8, base_gas_price if fuel_type == "Gasoline" else base_diesel_price + price_fluctuation + regional_adjustment + np.random.normal(loc=0, scale=0.2 if fuel_type == "Gasoline" else 0.3))  # Calculate fuel price
-                        gallons_sold = gasoline_gallons if fuel_type == "Gasoline" else diesel_gallons  # Get gallons sold
-
-                        sales_amount = gallons_sold * fuel_price  # Calculate sales amount
-
-                    if "New York" in store or "Los Angeles" in store:
-                        sales_amount *= 1.2  # Adjust sales amount
-                    elif "Chicago" in store or "Dallas" in store:
-                        sales_amount *= 1.1  # Adjust sales amount
-                    elif "San Jose" in store or "San Diego" in store:
-                        sales_amount *= 1.05  # Adjust sales amount
-
-                    if department == "Sales":
-                        sales_amount *= 1.2  # Adjust sales amount
-                    elif department == "Marketing":
-                        sales_amount *= 0.8  # Adjust sales amount
-
-                    if category == "Fuel":
-                        data.append({
-                            "store_id": store,
-                            "sales_date": current_date.strftime("%Y-%m-%d"),
-                            "product_category": category,
-                            "department": department,
-                            "sales_amount": sales_amount,
-                            "gallons_sold": gallons_sold,
-                            "fuel_type": fuel_type,
-                            "fuel_price": fuel_price,
-                        })
-
-                    else:
-                        data.append({
-                            "store_id": store,
-                            "sales_date": current_date.strftime("%Y-%m-%d"),
-                            "product_category": category,
-                            "department": department,
-                            "sales_amount": sales_amount,
-                            "gallons_sold": None,
-                            "fuel_type": None,
-                            "fuel_price": None,
-                        })
-            start_date += timedelta(days=1)  # Increment start date
-
-    df = pd.DataFrame(data)  # Create DataFrame
-    df.to_csv("generic_store_data.csv", index=False)  # Save DataFrame to CSV
+# Store/category catalog used by the generator. Sales parameters are (mean, std) of the daily
+# sales amount drawn for every store/department cell of a category.
+KROGER_CITIES = ["New York", "Los Angeles", "Chicago", "Houston", "Phoenix",
+                 "Philadelphia", "San Antonio", "San Diego", "Dallas", "San Jose"]  # List of cities
+KROGER_CATEGORIES = ["Electronics", "Clothing", "Groceries", "Home Goods", "Books", "Fuel"]  # List of product categories
+KROGER_DEPARTMENTS = ["Sales", "Marketing", "Inventory", "Customer Service"]  # List of departments
+KROGER_FUEL_TYPES = ["Gasoline", "Diesel"]  # List of fuel types
+KROGER_COLUMNS = ["store_id", "sales_date", "product_category", "department",
+                  "sales_amount", "gallons_sold", "fuel_type", "fuel_price"]  # Output schema
+KROGER_CATEGORICAL_COLUMNS = ["store_id", "product_category", "department", "fuel_type"]  # Dictionary-encoded columns
+
+CATEGORY_SALES_PARAMS = {
+    "Electronics": (1500, 400),
+    "Clothing": (1200, 350),
+    "Groceries": (2000, 500),
+    "Home Goods": (1000, 300),
+    "Books": (800, 250),
+}
+CITY_SALES_MULTIPLIER = {"New York": 1.2, "Los Angeles": 1.2, "Chicago": 1.1, "Dallas": 1.1,
+                         "San Jose": 1.05, "San Diego": 1.05}  # Regional sales adjustment
+DEPARTMENT_SALES_MULTIPLIER = {"Sales": 1.2, "Marketing": 0.8}  # Department sales adjustment
+FUEL_GALLONS_PARAMS = {"Gasoline": (1000, 300), "Diesel": (500, 150)}  # (mean, std) of gallons sold
+FUEL_BASE_PRICE = {"Gasoline": 3.8, "Diesel": 4.2}  # Base fuel price
+FUEL_PRICE_NOISE = {"Gasoline": 0.2, "Diesel": 0.3}  # Std of the daily fuel price noise
+FUEL_REGIONAL_ADJUSTMENT = {
+    "Gasoline": {"New York": 0.7, "Los Angeles": 0.7, "San Francisco": 0.5, "San Jose": 0.5},
+    "Diesel": {"New York": 0.8, "Los Angeles": 0.8, "Houston": 0.3, "Dallas": 0.3},
+}
+FUEL_MIN_PRICE = 2.8  # Floor for the fuel price
+
+def _kroger_store_catalog(rng, stores_per_city=2):
+    """Draws the store names (two per city by default) from ``rng``; store numbers are unique per city."""
+    pool = max(5, stores_per_city)  # Store numbers 1-5, or 1-N once a city has more than five stores
+    numbers = [rng.permutation(pool)[:stores_per_city] + 1 for _ in KROGER_CITIES]
+    return np.array([f"{city}_Store_{n}" for city, row in zip(KROGER_CITIES, numbers) for n in row])
+
+def _daily_generators(seed_seq, dates):
+    """Returns one generator per date, keyed on ``seed_seq``'s entropy and the calendar day.
+
+    A day's rows therefore depend only on the seed and the date, not on how the dates are chunked
+    or which window they fall in.
+    """
+    return [np.random.default_rng(np.random.SeedSequence(seed_seq.entropy, spawn_key=(day.toordinal(),)))
+            for day in pd.DatetimeIndex(dates).normalize()]
+
+def _sorted_categorical(codes, labels):
+    """Builds a categorical from ``codes`` into ``labels`` with its categories in sorted order.
+
+    Sorted categories match what ``astype("category")`` and CSV reads infer, so grouped output is in
+    the same order however the data was loaded.
+    """
+    return pd.Categorical.from_codes(codes, labels).reorder_categories(sorted(labels))
+
+def _generate_store_block(rngs, stores, dates):
+    """Generates every store x date x category x department row for ``stores`` and ``dates`` at once.
+
+    ``rngs`` holds one generator per date (see ``_daily_generators``). Every draw is a whole
+    store x department NumPy array per date, so the only Python-level work is per store and per date,
+    never per row. Rows are ordered store, date, category, department.
+    """
+    dates = pd.DatetimeIndex(dates).normalize()
+    n_stores, n_days = len(stores), len(dates)
+    n_cat, n_dept = len(KROGER_CATEGORIES), len(KROGER_DEPARTMENTS)
+    shape = (n_stores, n_days, n_cat, n_dept)
+
+    cities = [store.split("_")[0] for store in stores]
+    city_mult = np.array([CITY_SALES_MULTIPLIER.get(city, 1.0) for city in cities])
+    dept_mult = np.array([DEPARTMENT_SALES_MULTIPLIER.get(dept, 1.0) for dept in KROGER_DEPARTMENTS])
+    day_shape = (n_stores, n_dept)
+
+    def per_day(method, *args):  # (n_stores, n_days, n_dept) array, one slice from each date's generator
+        return np.stack([getattr(rng, method)(*args, size=day_shape) for rng in rngs], axis=1)
+
+    # Non-fuel categories: one normal draw per cell, clipped at zero
+    sales = np.empty(shape)
+    fuel_idx = KROGER_CATEGORIES.index("Fuel")
+    for c, category in enumerate(KROGER_CATEGORIES):
+        if c == fuel_idx:
+            continue
+        loc, scale = CATEGORY_SALES_PARAMS[category]
+        sales[:, :, c, :] = np.maximum(0, per_day("normal", loc, scale))
+
+    # Fuel: pick a fuel type per cell, then gallons and price for that type
+    is_diesel = per_day("integers", 0, 2).astype(bool)
+    gas_mean, gas_std = FUEL_GALLONS_PARAMS["Gasoline"]
+    diesel_mean, diesel_std = FUEL_GALLONS_PARAMS["Diesel"]
+    gallons = np.where(is_diesel,
+                       np.maximum(0, per_day("normal", diesel_mean, diesel_std)),
+                       np.maximum(0, per_day("normal", gas_mean, gas_std)))
+
+    week_of_year = dates.isocalendar().week.to_numpy(dtype=float)
+    price_fluctuation = (np.sin(week_of_year / 4) * 0.3)[None, :, None]  # Weekly price fluctuation
+    regional = {fuel: np.array([FUEL_REGIONAL_ADJUSTMENT[fuel].get(city, 0.0) for city in cities])[:, None, None]
+                for fuel in KROGER_FUEL_TYPES}
+    fuel_price = np.where(
+        is_diesel,
+        FUEL_BASE_PRICE["Diesel"] + price_fluctuation + regional["Diesel"]
+        + per_day("normal", 0, FUEL_PRICE_NOISE["Diesel"]),
+        FUEL_BASE_PRICE["Gasoline"] + price_fluctuation + regional["Gasoline"]
+        + per_day("normal", 0, FUEL_PRICE_NOISE["Gasoline"]))
+    fuel_price = np.maximum(FUEL_MIN_PRICE, fuel_price)
+    sales[:, :, fuel_idx, :] = gallons * fuel_price
+
+    sales *= city_mult[:, None, None, None] * dept_mult[None, None, None, :]  # Regional and department adjustment
+
+    # Fuel-only columns are NaN outside the Fuel category
+    gallons_col = np.full(shape, np.nan)
+    gallons_col[:, :, fuel_idx, :] = gallons
+    price_col = np.full(shape, np.nan)
+    price_col[:, :, fuel_idx, :] = fuel_price
+    fuel_codes = np.full(shape, -1, dtype=np.int8)
+    fuel_codes[:, :, fuel_idx, :] = is_diesel
+
+    store_categories = pd.unique(np.asarray(stores))
+    store_codes = pd.Index(store_categories).get_indexer(stores)
+    n_rows = int(np.prod(shape))
+    return pd.DataFrame({
+        "store_id": _sorted_categorical(np.repeat(store_codes, n_days * n_cat * n_dept), list(store_categories)),
+        "sales_date": np.tile(np.repeat(dates.to_numpy(), n_cat * n_dept), n_stores),
+        "product_category": _sorted_categorical(
+            np.tile(np.repeat(np.arange(n_cat), n_dept), n_stores * n_days), KROGER_CATEGORIES),
+        "department": _sorted_categorical(np.tile(np.arange(n_dept), n_stores * n_days * n_cat),
+                                          KROGER_DEPARTMENTS),
+        "sales_amount": sales.reshape(n_rows),
+        "gallons_sold": gallons_col.reshape(n_rows),
+        "fuel_type": _sorted_categorical(fuel_codes.reshape(n_rows), KROGER_FUEL_TYPES),
+        "fuel_price": price_col.reshape(n_rows),
+    }, columns=KROGER_COLUMNS)
+
+def generate_specific_store_data(num_days=90, seed=None, stores_per_city=2, output_path=CSV_FILE_PATH):
+    """Generates ``num_days`` of synthetic sales for every store and saves it to ``output_path``.
+
+    Pass ``seed`` to make a run reproducible.
+    """
+    seed_seq = np.random.SeedSequence(seed)  # Seeded for reproducible runs
+    stores = _kroger_store_catalog(np.random.default_rng(seed_seq), stores_per_city)  # Generate store names
+    start_date = pd.Timestamp.now().normalize() - pd.Timedelta(days=num_days)  # Calculate start date
+    dates = pd.date_range(start_date, periods=num_days, freq="D")
+
+    df = _generate_store_block(_daily_generators(seed_seq, dates), stores, dates)  # Create DataFrame
+    save_kroger_sales_data(df, output_path)  # Save DataFrame
     return df
 
+def iter_specific_store_data(num_days=90, seed=None, stores_per_city=2, chunk_days=7):
+    """Yields the same data as ``generate_specific_store_data`` in blocks of ``chunk_days`` dates.
+
+    Draws come from per-date generators, so with the same ``seed`` the rows match the in-memory run
+    for any ``chunk_days`` (only their order differs: chunk by chunk instead of store by store).
+    """
+    seed_seq = np.random.SeedSequence(seed)  # Seeded for reproducible runs
+    stores = _kroger_store_catalog(np.random.default_rng(seed_seq), stores_per_city)  # Generate store names
+    start_date = pd.Timestamp.now().normalize() - pd.Timedelta(days=num_days)  # Calculate start date
+    dates = pd.date_range(start_date, periods=num_days, freq="D")
+    for offset in range(0, num_days, chunk_days):
+        chunk = dates[offset:offset + chunk_days]
+        yield _generate_store_block(_daily_generators(seed_seq, chunk), stores, chunk)
+
+def stream_specific_store_data(output_path=CSV_FILE_PATH, num_days=90, seed=None, stores_per_city=2,
+                               chunk_days=7):
+    """Writes generated store data chunk by chunk so peak memory is one chunk, not the full horizon.
+
+    The output format follows the file extension: ``.parquet`` is written as one row group per chunk
+    (requires pyarrow), anything else is appended to as CSV. Returns the number of rows written.
+    """
+    chunks = iter_specific_store_data(num_days, seed, stores_per_city, chunk_days)
+    rows_written = 0
+    if output_path.endswith(".parquet"):
+        import pyarrow as pa  # Optional dependency, only needed for Parquet output
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)  # One row group per chunk
+                rows_written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(output_path, mode="w" if i == 0 else "a", header=(i == 0), index=False,
+                         date_format="%Y-%m-%d")  # Append each chunk to the CSV
+            rows_written += len(chunk)
+    logging.info(f"Streamed {rows_written} generated rows to {output_path}")  # Log info
+    return rows_written
+
 # --- Analysis Functions (Kroger Sales Data) ---
-def read_kroger_sales_data(csv_file):
+def _is_columnar_path(path):
+    return path.endswith((".parquet", ".arrow", ".feather"))
+
+def _with_columnar_types(df):
+    """Casts the label columns to categoricals and ``sales_date`` to a native timestamp."""
+    df = df.copy(deep=False)  # Only replaced columns are new, the rest are shared
+    for col in KROGER_CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    if "sales_date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["sales_date"]):
+        df["sales_date"] = pd.to_datetime(df["sales_date"], errors='coerce')
+    return df
+
+def save_kroger_sales_data(df, path):
+    """Saves sales data as Parquet (``.parquet``), Arrow IPC (``.arrow``/``.feather``) or CSV.
+
+    The columnar formats keep the label columns dictionary-encoded and dates as timestamps, so
+    reading them back needs no parsing.
+    """
+    if path.endswith(".parquet"):
+        _with_columnar_types(df).to_parquet(path, index=False)  # Requires pyarrow
+    elif _is_columnar_path(path):
+        _with_columnar_types(df).to_feather(path)  # Arrow IPC file, requires pyarrow
+    else:
+        df.to_csv(path, index=False, date_format="%Y-%m-%d")  # Save DataFrame to CSV
+    logging.info(f"Saved Kroger sales data: {path} (Shape: {df.shape})")  # Log info
+
+def read_kroger_sales_data(csv_file, columns=None):
+    """Reads sales data from CSV, Parquet or Arrow IPC, loading only ``columns`` when given."""
     try:
-        df = pd.read_csv(csv_file)  # Read CSV file
+        if csv_file.endswith(".parquet"):
+            df = pd.read_parquet(csv_file, columns=columns)  # Column projection, types are stored
+        elif _is_columnar_path(csv_file):
+            df = pd.read_feather(csv_file, columns=columns)  # Column projection, types are stored
+        else:
+            df = pd.read_csv(csv_file, usecols=columns,
+                             dtype={col: "category" for col in KROGER_CATEGORICAL_COLUMNS})  # Read CSV file
         df.columns = [str(col).strip().lower().replace(" ", "_") for col in df.columns]  # Clean column names
+        if not _is_columnar_path(csv_file):
+            df = _with_columnar_types(df)
         logging.info(f"Read Kroger sales data: {csv_file} (Shape: {df.shape})")  # Log info
         return df
     except FileNotFoundError:
@@ -143,265 +290,465 @@ def read_kroger_sales_data(csv_file):
         logging.error(f"Failed to read Kroger sales data '{csv_file}': {e}")  # Log error
         return pd.DataFrame()
 
-def analyze_kroger_sales(df):
+# Declarative list of the report metrics. Every metric is a sum or mean of ``column``, optionally
+# grouped by ``group_by`` and restricted to rows where ``where[0] == where[1]``. A metric with a
+# ``where`` filter is left out of the result when no row matches it.
+KrogerMetric = namedtuple("KrogerMetric", ["name", "column", "agg", "group_by", "where"], defaults=(None, None))
+FUEL_ROWS = ("product_category", "Fuel")
+
+KROGER_METRICS = [
+    KrogerMetric("total_sales", "sales_amount", "sum"),
+    KrogerMetric("avg_sales_per_store", "sales_amount", "mean", "store_id"),
+    KrogerMetric("total_sales_per_department", "sales_amount", "sum", "department"),
+    KrogerMetric("total_sales_per_category", "sales_amount", "sum", "product_category"),
+    KrogerMetric("daily_sales_trend", "sales_amount", "sum", "sales_date"),
+    KrogerMetric("total_fuel_sales", "sales_amount", "sum", where=FUEL_ROWS),
+    KrogerMetric("avg_fuel_price", "fuel_price", "mean", where=FUEL_ROWS),
+    KrogerMetric("total_gallons_sold", "gallons_sold", "sum", where=FUEL_ROWS),
+    KrogerMetric("gallons_sold_by_type", "gallons_sold", "sum", "fuel_type", where=FUEL_ROWS),
+]
+
+def _label_codes(series):
+    """Returns ``(codes, labels)`` for a key column: labels sorted by value, missing keys coded ``len(labels)``."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        series = series.dt.normalize()  # Daily keys
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        order = categories.argsort()  # Label order, not the (catalog) category order
+        rank = np.empty(len(order), dtype=np.intp)
+        rank[order] = np.arange(len(order))
+        codes, labels = series.cat.codes.to_numpy(), categories[order]
+        codes = np.where(codes >= 0, rank[codes], -1)
+    else:
+        codes, labels = pd.factorize(series, sort=True)
+    return np.where(codes >= 0, codes, len(labels)), labels
+
+def _partial_kroger_aggregates(df, metrics=KROGER_METRICS):
+    """Reduces ``df`` to ``{metric name: frame}`` of the column sum, non-null count and row count per label.
+
+    Each key column is factorized and each (column, ``where``) pair masked once; a grouped metric is
+    then three ``np.bincount`` passes over those codes. The frames are as small as the metric's key
+    (one row without ``group_by``), so finishing the metrics never touches anything ``df``-sized.
+    """
+    codes, masks, columns, partial = {}, {}, {}, {}
+    for metric in metrics:
+        if metric.where not in masks:
+            masks[metric.where] = ((df[metric.where[0]] == metric.where[1]).to_numpy() if metric.where
+                                   else np.ones(len(df), dtype=bool))
+        rows = masks[metric.where]
+        if (metric.column, metric.where) not in columns:  # Shared by every metric over the same rows
+            values = df[metric.column].to_numpy(dtype=float)
+            present = rows & ~np.isnan(values)
+            columns[metric.column, metric.where] = (np.where(present, values, 0.0), present)
+        weights, present = columns[metric.column, metric.where]
+        if metric.group_by is None:
+            partial[metric.name] = pd.DataFrame({"sum": [weights.sum()], "count": [present.sum()],
+                                                 "rows": [rows.sum()]})
+            continue
+        if metric.group_by not in codes:
+            codes[metric.group_by] = _label_codes(df[metric.group_by])
+        key, labels = codes[metric.group_by]
+        bins = len(labels) + 1  # Last bin collects missing keys and is dropped
+        frame = pd.DataFrame({
+            "sum": np.bincount(key, weights, minlength=bins)[:-1],
+            "count": np.bincount(key, present, minlength=bins)[:-1],
+            "rows": np.bincount(key, rows, minlength=bins)[:-1],
+        }, index=labels)
+        partial[metric.name] = frame[frame["rows"] > 0]  # Only keys that occur, as groupby reports them
+    return partial
+
+def _finalize_kroger_metrics(partial, metrics=KROGER_METRICS):
+    """Turns the per-label sums and counts from ``_partial_kroger_aggregates`` into the analysis dict."""
+    analysis = {}
+    for metric in metrics:
+        rows = partial[metric.name]
+        if metric.where and rows.empty:
+            continue
+        if metric.group_by is None:
+            total, count = rows["sum"].sum(), rows["count"].sum()
+            analysis[metric.name] = total if metric.agg == "sum" else (total / count if count else np.nan)
+            continue
+        values = rows["sum"] if metric.agg == "sum" else rows["sum"] / rows["count"]
+        if isinstance(values.index, pd.DatetimeIndex):
+            values.index = values.index.date  # Daily keys are reported as dates
+        analysis[metric.name] = values.to_dict()
+    return analysis
+
+def analyze_kroger_sales(df, metrics=KROGER_METRICS):
     analysis = {}
     if df.empty:
         logging.error("Kroger sales data is empty. Analysis aborted.")  # Log error
         return analysis
 
-    store_id_col = "store_id"  # Store ID column
-    department_col = "department"  # Department column
-    category_col = "product_category"  # Category column
     sales_col = "sales_amount"  # Sales column
     date_col = "sales_date"  # Date column
-    fuel_price_col = "fuel_price"  # Fuel price column
-    gallons_sold_col = "gallons_sold"  # Gallons sold column
-    fuel_type_col = "fuel_type"  # Fuel type column
-
-    df[sales_col] = pd.to_numeric(df[sales_col], errors='coerce')  # Convert sales to numeric
-    df[date_col] = pd.to_datetime(df[date_col], errors='coerce')  # Convert date to datetime
-
-    analysis["total_sales"] = df[sales_col].sum()  # Calculate total sales
-    analysis["avg_sales_per_store"] = df.groupby(store_id_col)[sales_col].mean().to_dict()  # Calculate average sales per store
-    analysis["total_sales_per_department"] = df.groupby(department_col)[sales_col].sum().to_dict()  # Calculate total sales per department
-    analysis["total_sales_per_category"] = df.groupby(category_col)[sales_col].sum().to_dict()  # Calculate total sales per category
-    analysis["daily_sales_trend"] = df.groupby(df[date_col].dt.date)[sales_col].sum().to_dict()  # Calculate daily sales trend
-
-    fuel_df = df[df[category_col] == "Fuel"]  # Filter fuel data
-    if not fuel_df.empty:
-        analysis["total_fuel_sales"] = fuel_df[sales_col].sum()  # Calculate total fuel sales
-        analysis["avg_fuel_price"] = fuel_df[fuel_price_col].mean()  # Calculate average fuel price
-        analysis["total_gallons_sold"] = fuel_df[gallons_sold_col].sum()  # Calculate total gallons sold
-        analysis["gallons_sold_by_type"] = fuel_df.groupby(fuel_type_col)[gallons_sold_col].sum().to_dict()  # Calculate gallons sold by fuel type
 
+    if not pd.api.types.is_numeric_dtype(df[sales_col]):
+        df[sales_col] = pd.to_numeric(df[sales_col], errors='coerce')  # Convert sales to numeric
+    if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+        df[date_col] = pd.to_datetime(df[date_col], errors='coerce')  # Convert date to datetime
+
+    partial = _partial_kroger_aggregates(df, metrics)  # Single scan over the full frame
+    analysis.update(_finalize_kroger_metrics(partial, metrics))  # Every metric is finished from the partials
     return analysis
 
-def generate_kroger_sales_visualizations(df):
-    if df.empty:
-        logging.warning("Kroger sales data is empty. Cannot generate visualizations.")  # Log warning
-        return
+# --- Incremental Analysis (Kroger Sales Data) ---
+# The saved state keeps, for every metric, the sum and non-null count of its column per ``group_by``
+# value and day, plus per store/day/category sales for the charts. A run aggregates only the new
+# rows into these buckets and appends them, so the work per run follows the delta; the window itself
+# is only held as a few buckets per day.
+KROGER_CHART_BUCKET = "_charts"  # State key of the chart buckets
+KROGER_CHART_KEYS = ["store_id", "sales_date", "product_category"]  # Grain of the chart buckets
+
+def _kroger_daily_buckets(df, metrics=KROGER_METRICS):
+    """Aggregates ``df`` into ``{metric name: frame}`` of per-(``group_by``, day) sums and counts.
 
+    Rows excluded by a metric's ``where`` filter never reach its buckets, so a metric with no matching
+    rows gets no buckets. The ``KROGER_CHART_BUCKET`` entry holds the chart sums and maxima. Every frame
+    is sorted by day (groupby keeps the store-major row order otherwise), which expiry relies on.
+    """
+    day = df["sales_date"].dt.normalize()
+    buckets = {}
+    for metric in metrics:
+        rows = df[df[metric.where[0]] == metric.where[1]] if metric.where else df
+        keys = [day[rows.index]]
+        if metric.group_by not in (None, "sales_date"):
+            keys.append(rows[metric.group_by])
+        buckets[metric.name] = (rows[metric.column].groupby(keys, observed=True, dropna=False, sort=False)
+                                .agg(["sum", "count"]).reset_index()
+                                .sort_values("sales_date", kind="stable", ignore_index=True))
+    chart_keys = [day if col == "sales_date" else df[col] for col in KROGER_CHART_KEYS]
+    buckets[KROGER_CHART_BUCKET] = (df["sales_amount"].groupby(chart_keys, observed=True, sort=False)
+                                    .agg(sales_amount="sum", sales_amount_max="max").reset_index()
+                                    .sort_values("sales_date", kind="stable", ignore_index=True))
+    return buckets
+
+def _append_kroger_buckets(frame, new, regroup=False):
+    """Appends ``new`` buckets to ``frame``; ``regroup`` merges buckets for days present in both."""
+    if frame is None or frame.empty:
+        return new
+    combined = pd.concat([frame, new], ignore_index=True)
+    for col in combined.columns:
+        dtypes = [frame[col].dtype, new[col].dtype]
+        if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes) and \
+                not isinstance(combined[col].dtype, pd.CategoricalDtype):
+            categories = pd.unique(np.concatenate([np.asarray(dtype.categories) for dtype in dtypes]))
+            combined[col] = pd.Categorical(combined[col], categories=categories)  # Keep the category order
+    if regroup:
+        key_cols = [col for col in combined.columns if col not in ("sum", "count", "sales_amount", "sales_amount_max")]
+        aggs = {col: ("max" if col == "sales_amount_max" else "sum") for col in combined.columns if col not in key_cols}
+        combined = combined.groupby(key_cols, observed=True, dropna=False, sort=False).agg(aggs).reset_index()
+        combined = combined.sort_values("sales_date", kind="stable", ignore_index=True)
+    return combined
+
+def _expire_kroger_buckets(frame, window_start):
+    """Drops buckets before ``window_start``; buckets are kept in date order, so this is a slice."""
+    return frame.iloc[frame["sales_date"].searchsorted(window_start):].reset_index(drop=True)
+
+def _finalize_kroger_buckets(buckets, metrics=KROGER_METRICS):
+    """Turns the per-metric daily buckets into the same dict as ``analyze_kroger_sales``."""
+    analysis = {}
+    for metric in metrics:
+        rows = buckets.get(metric.name)
+        if rows is None or (metric.where and rows.empty):
+            continue
+        if metric.group_by is None:
+            total, count = rows["sum"].sum(), rows["count"].sum()
+            analysis[metric.name] = total if metric.agg == "sum" else (total / count if count else np.nan)
+            continue
+        grouped = rows.groupby(metric.group_by, observed=True)[["sum", "count"]].sum()
+        grouped = grouped.iloc[np.argsort(np.asarray(grouped.index), kind="stable")]  # Label order, as in a full run
+        values = grouped["sum"] if metric.agg == "sum" else grouped["sum"] / grouped["count"]
+        if isinstance(values.index, pd.DatetimeIndex):
+            values.index = values.index.date  # Daily keys are reported as dates
+        analysis[metric.name] = values.to_dict()
+    return analysis
+
+def load_kroger_analysis_state(state_path=ANALYSIS_STATE_FILE):
+    """Loads the running aggregate state, or returns None when there is none yet."""
+    if not os.path.exists(state_path):
+        return None
+    try:
+        return pd.read_pickle(state_path)
+    except Exception as e:
+        logging.error(f"Failed to read Kroger analysis state '{state_path}': {e}")  # Log error
+        return None
+
+def save_kroger_analysis_state(state, state_path=ANALYSIS_STATE_FILE):
+    pd.to_pickle(state, state_path)  # Persist running aggregates locally
+    buckets = sum(len(frame) for frame in state["buckets"].values())
+    logging.info(f"Saved Kroger analysis state: {state_path} (Buckets: {buckets})")  # Log info
+
+def update_kroger_analysis_state(state, new_df, window_start, metrics=KROGER_METRICS):
+    """Aggregates only ``new_df`` into daily buckets, appends them to ``state`` and drops days before ``window_start``."""
+    state = dict(state or {})
+    buckets = dict(state.get("buckets") or {})
+    if not new_df.empty:
+        # Days already in the state (e.g. a re-run over the same data) are merged, not duplicated
+        overlaps = "last_date" in state and new_df["sales_date"].min().normalize() <= state["last_date"]
+        for name, frame in _kroger_daily_buckets(new_df, metrics).items():
+            buckets[name] = _append_kroger_buckets(buckets.get(name), frame, regroup=overlaps)
+        state["last_date"] = max(state.get("last_date", pd.Timestamp.min), new_df["sales_date"].max().normalize())
+    state["buckets"] = {name: _expire_kroger_buckets(frame, window_start) for name, frame in buckets.items()}
+    return state
+
+def analyze_kroger_sales_from_state(state, metrics=KROGER_METRICS):
+    """Returns the same dict as ``analyze_kroger_sales`` over the rows folded into ``state``."""
+    if not state or not state.get("buckets") or state["buckets"][KROGER_CHART_BUCKET].empty:
+        logging.error("Kroger analysis state is empty. Analysis aborted.")  # Log error
+        return {}
+    return _finalize_kroger_buckets(state["buckets"], metrics)
+
+def kroger_sales_frame_from_state(state):
+    """Returns the chart frame (sales sum and maximum per store/date/category) kept in ``state``."""
+    return state["buckets"][KROGER_CHART_BUCKET]
+
+def run_incremental_analysis(num_days=ANALYSIS_WINDOW_DAYS, seed=None, stores_per_city=2,
+                             state_path=ANALYSIS_STATE_FILE):
+    """Generates only the days added since the last run and folds them into the saved state.
+
+    Returns ``(df, analysis)`` where ``df`` is the chart frame rebuilt from the state and ``analysis``
+    matches ``analyze_kroger_sales`` over the whole ``num_days`` window.
+    """
+    state = load_kroger_analysis_state(state_path)
+    today = pd.Timestamp.now().normalize()
+    window_start = today - pd.Timedelta(days=num_days)  # Same window as generate_specific_store_data
+    seed_seq = np.random.SeedSequence(seed)  # New days draw from their own per-date generators
+    if state is None or "buckets" not in state:  # No state yet (or an older layout): rebuild the window
+        stores = (state or {}).get("stores")
+        state = {"stores": stores if stores is not None else _kroger_store_catalog(np.random.default_rng(seed_seq), stores_per_city)}
+    first_new = max(window_start, state.get("last_date", window_start - pd.Timedelta(days=1)) + pd.Timedelta(days=1))
+    new_dates = pd.date_range(first_new, today - pd.Timedelta(days=1), freq="D")
+    new_df = (_generate_store_block(_daily_generators(seed_seq, new_dates), state["stores"], new_dates)
+              if len(new_dates) else pd.DataFrame())
+    logging.info(f"Incremental analysis: {len(new_dates)} new day(s), {len(new_df)} new row(s)")  # Log info
+
+    state = update_kroger_analysis_state(state, new_df, window_start)
+    save_kroger_analysis_state(state, state_path)
+    return kroger_sales_frame_from_state(state), analyze_kroger_sales_from_state(state)
+
+# --- Visualization Functions (Kroger Sales Data) ---
+# Each renderer runs in a worker process on a small, pre-aggregated frame and draws on its own
+# Figure, so nothing depends on the global pyplot state.
+def _usd_formatter():
+    return ticker.FuncFormatter(lambda x, p: format(int(x), ','))
+
+def _figure_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')  # Render straight into memory, no local PNG
+    return buffer.getvalue()
+
+def _new_figure(figsize):
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)  # Attach an Agg canvas so layout and savefig need no pyplot
+    return fig, fig.subplots()
+
+def _render_sales_by_store(store_sales):
+    # Average Sales Amount per Store Chart (Improved - Colored)
+    fig, ax = _new_figure((14, 8))  # Adjust figure size for better fit
+    cities = store_sales['city'].unique()
+    cmap = matplotlib.colormaps['viridis']
+    for i, city in enumerate(cities):  # Create bars with colors based on city
+        city_data = store_sales[store_sales['city'] == city]
+        ax.bar(city_data['store_id'], city_data['sales_amount'], label=city, color=cmap(i / len(cities)))
+    ax.set_title('Average Sales Amount per Store', y=1.05)
+    ax.set_xlabel('Store')
+    ax.set_ylabel('Sales Amount (USD)')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    ax.legend(bbox_to_anchor=(1.01, 1), borderaxespad=0.)  # Add legend
+    fig.tight_layout(rect=[0, 0, 0.95, 1])  # Adjust layout to fit legend
+    return _figure_png(fig)
+
+def _render_sales_trend(weekly_sales):
+    # Sales Trend Over Time Chart (Improved - Weekly Aggregation)
+    fig, ax = _new_figure((12, 6))
+    weekly_sales.plot(ax=ax)
+    ax.set_title('Sales Trend Over Time', y=1.05)
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Total Sales (USD)')
+    ax.xaxis.set_major_locator(mdates.WeekdayLocator(interval=1))  # Show weekly dates
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))  # Format dates as month-day
+    for label in ax.get_xticklabels():  # Rotate labels
+        label.set_rotation(45)
+        label.set_horizontalalignment('right')
+    ax.yaxis.set_major_formatter(_usd_formatter())  # Format Y-axis with commas
+    fig.tight_layout()
+    return _figure_png(fig)
+
+def _render_sales_by_category(category_sales):
+    # Total Sales by Category Chart (Improved)
+    fig, ax = _new_figure((12, 6))
+    ax.bar(category_sales.index.astype(str), category_sales.values, color='royalblue')
+    ax.set_title('Total Sales by Category', y=1.05)
+    ax.set_xlabel('Product Category')
+    ax.set_ylabel('Total Sales (USD)')
+    ax.yaxis.set_major_formatter(_usd_formatter())
+    fig.tight_layout()
+    return _figure_png(fig)
+
+def _render_sales_by_region(top_categories):
+    # Highest Sales by Region Chart (Improved)
+    fig, ax = _new_figure((14, 8))  # Adjust figure size for better fit
+    sns.barplot(x='city', y='sales_amount', hue='product_category', data=top_categories, palette='viridis', ax=ax)
+    ax.set_title('Top 2 Sales by Region', y=1.05)
+    ax.set_xlabel('City')  # Change x-axis label to 'City'
+    ax.set_ylabel('Total Sales (USD)')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    ax.legend(bbox_to_anchor=(1.01, 1), borderaxespad=0.)  # Move legend outside the chart
+    fig.tight_layout(rect=[0, 0, 0.95, 1])  # Adjust layout to fit legend
+    return _figure_png(fig)
+
+def _kroger_chart_jobs(df):
+    """Pre-aggregates ``df`` into the small frames each chart draws, as (renderer, data, filename) jobs."""
     store_id_col = "store_id"
-    department_col = "department"
     category_col = "product_category"
     sales_col = "sales_amount"
     date_col = "sales_date"
 
-    df[sales_col] = pd.to_numeric(df[sales_col], errors='coerce')
-    df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-
-    # Average Sales Amount per Store Chart (Improved - Colored)
-    plt.figure(figsize=(14, 8))  # Adjust figure size for better fit
-
-    # Extract store locations (cities)
-    df['city'] = df[store_id_col].apply(lambda x: x.split('_')[0])
-    cities = df['city'].unique()
-
-    # Create a color mapping for each city
-    color_map = {city: plt.cm.get_cmap('viridis')(i / len(cities)) for i, city in enumerate(cities)}
+    # Bars of every row overlap at the store position, so the per-store maximum is what gets drawn
+    max_col = "sales_amount_max" if "sales_amount_max" in df.columns else sales_col  # Chart buckets carry row maxima
+    store_sales = df.groupby(store_id_col, observed=True, sort=False)[max_col].max().rename(sales_col).reset_index()
+    store_sales[store_id_col] = store_sales[store_id_col].astype(str)
+    store_sales['city'] = store_sales[store_id_col].str.split('_').str[0]  # Extract store locations (cities)
 
-    # Create bars with colors based on city
-    for city in cities:
-        city_data = df[df['city'] == city]
-        plt.bar(city_data[store_id_col], city_data[sales_col], label=city, color=color_map[city])
-
-    plt.title('Average Sales Amount per Store', y=1.05)
-    plt.xlabel('Store')
-    plt.ylabel('Sales Amount (USD)')
-    plt.xticks(rotation=45, ha='right')
-
-    # Add legend
-    plt.legend(bbox_to_anchor=(1.01, 1), borderaxespad=0.)
-
-    plt.tight_layout(rect=[0, 0, 0.95, 1])  # Adjust layout to fit legend
-    plt.savefig("sales_by_store.png")
-    upload_to_s3("sales_by_store.png", S3_VISUALIZATIONS_PREFIX + "sales_by_store.png")
-    plt.close()
-
-    # Sales Trend Over Time Chart (Improved - Weekly Aggregation)
-    plt.figure(figsize=(12, 6))
     weekly_sales = df.resample('W', on=date_col)[sales_col].sum()  # Aggregate to weekly sums
-    ax = weekly_sales.plot()
-    plt.title('Sales Trend Over Time', y=1.05)
-    plt.xlabel('Date')
-    plt.ylabel('Total Sales (USD)')
+    category_sales = df.groupby(category_col, observed=True)[sales_col].sum()
 
-    # Format X-axis Dates (Weekly Intervals)
-    ax.xaxis.set_major_locator(mdates.WeekdayLocator(interval=1))  # Show weekly dates
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))  # Format dates as month-day
-    plt.xticks(rotation=45, ha='right')  # Rotate labels
+    city = df[store_id_col].astype(str).str.split('_').str[0]
+    region_sales = df.groupby([city.rename('city'), df[category_col].astype(str)])[sales_col].sum().reset_index()
+    top_categories = (region_sales.sort_values(['city', sales_col], ascending=[True, False])
+                      .groupby('city').head(2).reset_index(drop=True))
 
-    # Format Y-axis with commas
-    ax.yaxis.set_major_formatter(ticker.FuncFormatter(lambda x, p: format(int(x), ',')))
+    return [
+        (_render_sales_by_store, store_sales, "sales_by_store.png"),
+        (_render_sales_trend, weekly_sales, "sales_trend.png"),
+        (_render_sales_by_category, category_sales, "sales_by_category.png"),
+        (_render_sales_by_region, top_categories, "sales_by_region.png"),
+    ]
 
-    plt.tight_layout()
-    plt.savefig("sales_trend.png")
-    upload_to_s3("sales_trend.png", S3_VISUALIZATIONS_PREFIX + "sales_trend.png")
-    plt.close()
-
-    # Total Sales by Category Chart (Improved)
-    plt.figure(figsize=(12, 6))
-    ax = sns.barplot(x=category_col, y=sales_col, data=df, estimator=sum, color='royalblue')
-    plt.title('Total Sales by Category', y=1.05)
-    plt.xlabel('Product Category')
-    plt.ylabel('Total Sales (USD)')
-    ax.yaxis.set_major_formatter(ticker.FuncFormatter(lambda x, p: format(int(x), ',')))
-    plt.tight_layout()
-    plt.savefig("sales_by_category.png")
-    upload_to_s3("sales_by_category.png", S3_VISUALIZATIONS_PREFIX + "sales_by_category.png")
-    plt.close()
+def generate_kroger_sales_visualizations(df, max_workers=None):
+    """Renders the four report charts to PNG bytes in worker processes and uploads each one as it finishes.
 
-    # Highest Sales by Region Chart (Improved)
-    plt.figure(figsize=(14, 8))  # Adjust figure size for better fit
-    df['city'] = df['store_id'].apply(lambda x: x.split('_')[0])
-    region_sales = df.groupby(['city', 'product_category'])[sales_col].sum().reset_index()
-    top_categories = region_sales.groupby('city').apply(lambda x: x.nlargest(2, sales_col)).reset_index(drop=True)
-
-    # Use grouped bar chart
-    sns.barplot(x='city', y=sales_col, hue='product_category', data=top_categories, palette='viridis')  # Use 'viridis' palette
-
-    plt.title('Top 2 Sales by Region', y=1.05)
-    plt.xlabel('City')  # Change x-axis label to 'City'
-    plt.ylabel('Total Sales (USD)')
-    plt.xticks(rotation=45, ha='right')
-
-    # Move legend outside the chart
-    plt.legend(bbox_to_anchor=(1.01, 1), borderaxespad=0.)
-
-    plt.tight_layout(rect=[0, 0, 0.95, 1])  # Adjust layout to fit legend
-    plt.savefig("sales_by_region.png")
-    upload_to_s3("sales_by_region.png", S3_VISUALIZATIONS_PREFIX + "sales_by_region.png")
-    plt.close()
-
-def generate_static_html(analysis_results):
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Kroger Sales Analysis</title>
-        <style>
-            body {{
-                font-family: sans-serif;
-                margin: 20px;
-            }}
-            h1 {{
-                text-align: center;
-            }}
-            .section {{
-                margin-bottom: 20px;
-            }}
-            table {{
-                width: 100%;
-                border-collapse: collapse;
-            }}
-            th, td {{
-                border: 1px solid #ddd;
-                padding: 8px;
-                text-align: left;
-            }}
-            th {{
-                background-color: #f2f2f2;
-                font-weight: bold;
-            }}
-            .number {{
-                text-align: right;
-            }}
-            .bar-chart {{
-                width: 80%;
-                margin: 20px auto;
-            }}
-            .bar-chart img {{
-                width: 100%;
-            }}
-        </style>
-    </head>
-    <body>
-        <h1>Kroger Sales Analysis (Last 90 Days)</h1>
-
-        <div class="section">
-            <h2>Total Sales</h2>
-            <p><b>${analysis_results.get('total_sales', 'N/A'):,.2f}</b></p>
-        </div>
-
-        <div class="section">
-            <h2>Average Sales per Store</h2>
-            <table>
-                <tr>
-                    <th>Store</th>
-                    <th class="number">Average Sales (USD)</th>
-                </tr>
-                {''.join([f'<tr><td>{store}</td><td class="number">{sales:,.2f}</td></tr>' for store, sales in analysis_results.get('avg_sales_per_store', {}).items()])}
-            </table>
-        </div>
-
-        <div class="section">
-            <h2>Total Fuel Sales</h2>
-            <p><b>{analysis_results.get('total_fuel_sales', 'N/A'):,.0f}</b></p>
-        </div>
-
-        <div class="section">
-            <h2>Average Fuel Price</h2>
-            <p><b>${analysis_results.get('avg_fuel_price', 'N/A'):,.2f}</b></p>
-        </div>
-
-        <div class="section">
-            <h2>Total Gallons Sold</h2>
-            <p><b>{analysis_results.get('total_gallons_sold', 'N/A'):,.0f}</b></p>
-        </div>
-
-        <div class="section">
-            <div class="bar-chart">
-                <h2>Average Sales Amount per Store</h2>
-                <img src="{S3_VISUALIZATIONS_PREFIX}sales_by_store.png" alt="Average Sales Amount per Store">
-            </div>
-        </div>
-
-        <div class="section">
-            <div class="bar-chart">
-                <h2>Sales Trend Over Time</h2>
-                <img src="{S3_VISUALIZATIONS_PREFIX}sales_trend.png" alt="Sales Trend Over Time">
-            </div>
-        </div>
-
-        <div class="section">
-            <div class="bar-chart">
-                <h2>Total Sales by Category</h2>
-                <img src="{S3_VISUALIZATIONS_PREFIX}sales_by_category.png" alt="Total Sales by Category">
-            </div>
-        </div>
-
-        <div class="section">
-            <div class="bar-chart">
-                <h2>Top 2 Sales by Region</h2>
-                <img src="{S3_VISUALIZATIONS_PREFIX}sales_by_region.png" alt="Top 2 Sales by Region">
-            </div>
-        </div>
-
-    </body>
-    </html>
+    Returns ``{s3_key: "uploaded" | "skipped"}`` for the charts.
     """
-    with open(HTML_FILE_NAME, "w") as f:
-        f.write(html_content)
+    if df.empty:
+        logging.warning("Kroger sales data is empty. Cannot generate visualizations.")  # Log warning
+        return {}
 
-def upload_static_html_to_s3():
-    s3 = boto3.client("s3", region_name=S3_REGION)  # Initialize S3 client
-    s3.upload_file(HTML_FILE_NAME, S3_BUCKET_NAME, HTML_FILE_NAME, ExtraArgs={'ContentType': 'text/html'})  # Upload HTML file
-    logging.info(f"Uploaded {HTML_FILE_NAME} to S3 bucket: {S3_BUCKET_NAME}")  # Log info
+    sales_col = "sales_amount"
+    date_col = "sales_date"
 
-def process_and_upload():
-    df = generate_specific_store_data()  # Generate store data
-    analysis_results = analyze_kroger_sales(df)  # Analyze sales data
-    generate_kroger_sales_visualizations(df)  # Generate visualizations
-    generate_static_html(analysis_results)  # Generate HTML
-    upload_static_html_to_s3()  # Upload HTML to S3
+    if not pd.api.types.is_numeric_dtype(df[sales_col]):
+        df[sales_col] = pd.to_numeric(df[sales_col], errors='coerce')
+    if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+        df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
+
+    jobs = _kroger_chart_jobs(df)
+    with ProcessPoolExecutor(max_workers=max_workers or min(len(jobs), os.cpu_count() or 1)) as render_pool, \
+            ThreadPoolExecutor(max_workers=len(jobs)) as upload_pool:
+        renders = {render_pool.submit(render, data): filename for render, data, filename in jobs}
+        uploads = {}
+        for future in as_completed(renders):  # Upload each chart while the others are still rendering
+            s3_key = S3_VISUALIZATIONS_PREFIX + renders[future]
+            uploads[s3_key] = upload_pool.submit(upload_bytes_to_s3, future.result(), s3_key,
+                                                 {'ContentType': 'image/png'})
+        upload_report = {s3_key: upload.result() for s3_key, upload in uploads.items()}
+    return upload_report
+
+# --- Static Report Page ---
+KROGER_CHARTS = [
+    ("sales_by_store.png", "Average Sales Amount per Store"),
+    ("sales_trend.png", "Sales Trend Over Time"),
+    ("sales_by_category.png", "Total Sales by Category"),
+    ("sales_by_region.png", "Top 2 Sales by Region"),
+]
+
+def _format_number(value, decimals=2):
+    return "N/A" if value is None or isinstance(value, Undefined) else f"{value:,.{decimals}f}"
+
+def _format_currency(value, decimals=2):
+    return "N/A" if value is None or isinstance(value, Undefined) else f"${value:,.{decimals}f}"
+
+@lru_cache(maxsize=1)
+def _kroger_report_template():
+    """Loads and compiles the report template once per process; the bytecode cache also spans runs."""
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=select_autoescape(["html"]),
+        bytecode_cache=FileSystemBytecodeCache(),  # Compiled template reused across processes
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+    env.filters["number"] = _format_number
+    env.filters["currency"] = _format_currency
+    return env.get_template(HTML_TEMPLATE_NAME)
+
+def _compressing_writer(raw, encoding):
+    """Wraps the binary file ``raw`` so writes are compressed with ``encoding`` ("gzip" or "br")."""
+    if encoding == "br":
+        import brotli  # Optional dependency, only needed for Brotli output
+
+        class _BrotliWriter:
+            def __init__(self):
+                self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT)
+            def write(self, data):
+                raw.write(self._compressor.process(data))
+            def close(self):
+                raw.write(self._compressor.finish())
+        return _BrotliWriter()
+    # mtime=0 and no file name keep the bytes identical for identical pages (see upload_to_s3)
+    return gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0)
+
+def generate_static_html(analysis_results, content_encoding=HTML_CONTENT_ENCODING):
+    """Streams the report page through the cached template into a pre-compressed file and returns its path."""
+    output_path = f"{HTML_FILE_NAME}.{'br' if content_encoding == 'br' else 'gz'}"
+    stream = _kroger_report_template().stream(
+        analysis=analysis_results,
+        window_days=ANALYSIS_WINDOW_DAYS,
+        charts=KROGER_CHARTS,
+        visualizations_prefix=S3_VISUALIZATIONS_PREFIX,
+    )
+    with open(output_path, "wb") as raw:
+        writer = _compressing_writer(raw, content_encoding)
+        for chunk in stream:
+            writer.write(chunk.encode("utf-8"))  # Rendered and compressed chunk by chunk
+        writer.close()
+    return output_path
+
+def upload_static_html_to_s3(html_path=None, content_encoding=HTML_CONTENT_ENCODING):
+    html_path = html_path or f"{HTML_FILE_NAME}.{'br' if content_encoding == 'br' else 'gz'}"
+    extra_args = {'ContentType': 'text/html; charset=utf-8', 'ContentEncoding': content_encoding}
+    return upload_to_s3(html_path, HTML_FILE_NAME, extra_args=extra_args)  # Upload pre-compressed HTML file
+
+def log_upload_report(upload_report):
+    uploaded = [key for key, status in upload_report.items() if status == "uploaded"]
+    skipped = [key for key, status in upload_report.items() if status == "skipped"]
+    logging.info(f"Upload report: {len(uploaded)} uploaded {uploaded}, {len(skipped)} skipped (unchanged) {skipped}")  # Log info
+
+def process_and_upload(incremental=False):
+    if incremental:
+        df, analysis_results = run_incremental_analysis()  # Fold new days into the saved aggregates
+    else:
+        df = generate_specific_store_data(output_path=DATA_FILE_PATH)  # Generate store data
+        analysis_results = analyze_kroger_sales(df)  # Analyze sales data
+    upload_report = generate_kroger_sales_visualizations(df)  # Generate visualizations
+    html_path = generate_static_html(analysis_results)  # Generate HTML
+    upload_report[HTML_FILE_NAME] = upload_static_html_to_s3(html_path)  # Upload HTML to S3
+    log_upload_report(upload_report)
+    return upload_report
 
 def scheduled_task():
-    process_and_upload()  # Process and upload data
+    process_and_upload(incremental=INCREMENTAL_ANALYSIS)  # Process and upload data
     logging.info("Scheduled task completed.")  # Log info
     print_website_url()  # Print website URL
 
 def print_website_url():
-    s3_client = boto3.client('s3', region_name=S3_REGION)  # Initialize S3 client
+    s3_client = get_s3_service(S3_REGION).client  # Shared S3 client
     try:
         response = s3_client.get_bucket_website(Bucket=S3_BUCKET_NAME)  # Get website configuration
         print(f"Full Response: {response}")  # Print response
@@ -424,16 +771,120 @@ def print_website_url():
         else:
             print(f"An error occurred: {e}")  # Print error message
 
-def upload_to_s3(filename, s3_filename):
-    s3 = boto3.client("s3", region_name=S3_REGION)  # Initialize S3 client
-    s3.upload_file(filename, S3_BUCKET_NAME, s3_filename)  # Upload file to S3
-    logging.info(f"Uploaded {filename} to S3 bucket: {S3_BUCKET_NAME}/{s3_filename}")  # Log info
+# --- Content-Addressed Uploads ---
+_manifest_lock = threading.Lock()  # Uploads run on several threads
 
-if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')  # Configure logging
+def _file_md5(filename):
+    digest = hashlib.md5()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _load_upload_manifest():
+    try:
+        with open(UPLOAD_MANIFEST_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _record_upload(s3_filename, content_hash):
+    with _manifest_lock:
+        manifest = _load_upload_manifest()
+        manifest[s3_filename] = content_hash
+        with open(UPLOAD_MANIFEST_FILE, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+def _remote_etag(s3, s3_filename):
+    try:
+        return s3.head_object(Bucket=S3_BUCKET_NAME, Key=s3_filename)["ETag"].strip('"')
+    except ClientError:
+        return None  # Missing object (or no access): upload it
+
+def _upload_if_changed(content_hash, s3_filename, upload, label):
+    """Runs ``upload(s3_service)`` unless ``content_hash`` is already stored under ``s3_filename``.
+
+    The hash is checked against the local manifest first and then against the object's ETag, so
+    unchanged artifacts cost no PUT. Returns ``"uploaded"`` or ``"skipped"``.
+    """
+    with _manifest_lock:
+        known_hash = _load_upload_manifest().get(s3_filename)
+    if known_hash == content_hash:
+        logging.info(f"Skipped {label}: unchanged since last upload ({S3_BUCKET_NAME}/{s3_filename})")  # Log info
+        return "skipped"
+
+    s3 = get_s3_service(S3_REGION)  # Shared S3 client and transfer settings
+    if _remote_etag(s3.client, s3_filename) == content_hash:
+        _record_upload(s3_filename, content_hash)
+        logging.info(f"Skipped {label}: matches S3 ETag ({S3_BUCKET_NAME}/{s3_filename})")  # Log info
+        return "skipped"
+
+    upload(s3)
+    _record_upload(s3_filename, content_hash)
+    logging.info(f"Uploaded {label} to S3 bucket: {S3_BUCKET_NAME}/{s3_filename}")  # Log info
+    return "uploaded"
+
+def upload_to_s3(filename, s3_filename, extra_args=None):
+    """Uploads a local file unless the same bytes are already stored under ``s3_filename``."""
+    return _upload_if_changed(_file_md5(filename), s3_filename,
+                              lambda s3: s3.upload_file(filename, S3_BUCKET_NAME, s3_filename, extra_args), filename)
+
+def upload_bytes_to_s3(data, s3_filename, extra_args=None):
+    """Uploads in-memory ``data`` (e.g. a rendered chart) unless it is already stored under ``s3_filename``."""
+    return _upload_if_changed(hashlib.md5(data).hexdigest(), s3_filename,
+                              lambda s3: s3.upload_fileobj(io.BytesIO(data), S3_BUCKET_NAME, s3_filename, extra_args),
+                              s3_filename)
+
+# --- Serving ---
+def _local_report_path(content_encoding=HTML_CONTENT_ENCODING):
+    return os.path.abspath(f"{HTML_FILE_NAME}.{'br' if content_encoding == 'br' else 'gz'}")
+
+@routes.route("/")
+def report_page():
+    """Serves the last generated report page straight from its pre-compressed file."""
+    html_path = _local_report_path()
+    if not os.path.exists(html_path):
+        return "Report not generated yet.", 404
+    if HTML_CONTENT_ENCODING in request.accept_encodings:
+        response = send_file(html_path, mimetype="text/html", conditional=True)
+        response.headers["Content-Encoding"] = HTML_CONTENT_ENCODING
+    elif HTML_CONTENT_ENCODING == "gzip":
+        with gzip.open(html_path, "rb") as f:
+            response = Response(f.read(), mimetype="text/html")  # Rare client without gzip support
+    else:
+        return "Client does not accept the report's content encoding.", 406
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+@routes.route(f"/{S3_VISUALIZATIONS_PREFIX}<filename>")
+def report_chart(filename):
+    """Charts live only in S3; point the browser at the bucket's website endpoint."""
+    return redirect(f"http://{S3_BUCKET_NAME}.s3-website-{S3_REGION}.amazonaws.com/{S3_VISUALIZATIONS_PREFIX}{filename}")
+
+def create_app(config=None):
+    """Builds the Flask app serving the latest report; WSGI servers call this once per worker process.
+
+    Run with e.g. ``gunicorn -w 4 --threads 8 'kroger_store_data:create_app()'``. Report generation
+    stays in ``run_scheduler()`` (``python kroger_store_data.py``) so workers don't each run it.
+    """
+    app = Flask(__name__)
+    app.config.from_prefixed_env("KROGER")
+    if config:
+        app.config.update(config)
+    app.register_blueprint(routes)
+    get_s3_service(S3_REGION)  # Connection pool for this worker, ready before the first request
+    _kroger_report_template()  # Compile the report template once per worker
+    return app
+
+def run_scheduler():
+    """Generates and uploads the report now and then every 6 hours."""
     scheduled_task()  # Run scheduled task once
     schedule.every(6).hours.do(scheduled_task)  # Schedule task to run every 6 hours
     logging.info("Scheduled task set to run every 6 hours.")  # Log info
     while True:
         schedule.run_pending()  # Run pending scheduled tasks
-        time.sleep(60)  # Sleep for 60 seconds
\ No newline at end of file
+        time.sleep(60)  # Sleep for 60 seconds
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')  # Configure logging
+    run_scheduler()
@@ -0,0 +1,87 @@
+import os  # Import os for the fork hook
+import threading  # Import threading for the client registry lock
+import logging  # Import logging for logging messages
+from concurrent.futures import ThreadPoolExecutor  # Import ThreadPoolExecutor for batch uploads
+
+import boto3  # Import boto3 for AWS S3 interaction
+from boto3.s3.transfer import TransferConfig  # Import TransferConfig for multipart settings
+from botocore.config import Config  # Import Config for connection pool settings
+
+# Connection pool and multipart tuning shared by every S3 transfer in the apps
+MAX_POOL_CONNECTIONS = 50  # Concurrent HTTP connections kept open per client
+MULTIPART_THRESHOLD = 8 * 1024 * 1024  # Files larger than this are uploaded in parts
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024  # Size of each multipart part
+MULTIPART_CONCURRENCY = 10  # Parallel part uploads per file
+BATCH_UPLOAD_WORKERS = 8  # Files uploaded at the same time by upload_many
+
+class S3TransferService:
+    """Long-lived S3 client plus transfer settings, safe to share between threads.
+
+    Building a boto3 client resolves credentials and endpoints, so the apps create one service per
+    region (see ``get_s3_service``) and reuse its connection pool for every call.
+    """
+
+    def __init__(self, region_name=None, max_pool_connections=MAX_POOL_CONNECTIONS, transfer_config=None):
+        self.region_name = region_name
+        session = boto3.session.Session()  # Own session: the default one is not thread-safe
+        self.client = session.client(
+            "s3",
+            region_name=region_name,
+            config=Config(max_pool_connections=max_pool_connections, retries={"max_attempts": 5, "mode": "standard"}),
+        )
+        self.transfer_config = transfer_config or TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=MULTIPART_CHUNKSIZE,
+            max_concurrency=MULTIPART_CONCURRENCY,
+            use_threads=True,
+        )
+
+    def upload_file(self, filename, bucket, key, extra_args=None):
+        self.client.upload_file(filename, bucket, key, ExtraArgs=extra_args, Config=self.transfer_config)
+
+    def upload_fileobj(self, fileobj, bucket, key, extra_args=None):
+        self.client.upload_fileobj(fileobj, bucket, key, ExtraArgs=extra_args, Config=self.transfer_config)
+
+    def upload_many(self, uploads, bucket, max_workers=BATCH_UPLOAD_WORKERS):
+        """Uploads ``(source, key, extra_args)`` items concurrently; ``source`` is a path or a file object.
+
+        Returns ``{key: None}`` for successful uploads and ``{key: exception}`` for failed ones, so one
+        failed artifact does not abort the rest of the batch.
+        """
+        def _upload(source, key, extra_args):
+            if isinstance(source, str):
+                self.upload_file(source, bucket, key, extra_args)
+            else:
+                self.upload_fileobj(source, bucket, key, extra_args)
+            logging.info(f"Uploaded {key} to S3 bucket: {bucket}")
+
+        uploads = list(uploads)
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(uploads)))) as pool:
+            futures = {key: pool.submit(_upload, source, key, extra_args) for source, key, extra_args in uploads}
+            for key, future in futures.items():
+                try:
+                    future.result()
+                    results[key] = None
+                except Exception as e:
+                    logging.error(f"Error uploading '{key}' to S3 bucket {bucket}: {e}")
+                    results[key] = e
+        return results
+
+_services = {}  # One service per region, created on first use
+_services_lock = threading.Lock()
+
+def _reset_services_after_fork():
+    global _services_lock
+    _services.clear()  # Clients and their connection pools must not be shared with the parent process
+    _services_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_services_after_fork)
+
+def get_s3_service(region_name=None):
+    """Returns the shared ``S3TransferService`` for ``region_name``, creating it on first use."""
+    with _services_lock:
+        service = _services.get(region_name)
+        if service is None:
+            service = _services[region_name] = S3TransferService(region_name)
+        return service